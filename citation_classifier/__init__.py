@@ -0,0 +1,27 @@
+"""DSPy ile atıf niyeti sınıflandırma.
+
+Paketi içe aktarmak hiçbir yan etki (LM oluşturma, veri okuma, optimizasyon) üretmez;
+dspy/pandas gibi ağır bağımlılıklar yalnızca ilgili isim ilk kullanıldığında yüklenir.
+"""
+
+from .config import CITATION_CLASSES
+
+_LAZY_EXPORTS = {
+    "CitationIntentSignature": ".program",
+    "ClassifyCitation": ".program",
+    "load_and_prepare_trainset": ".data",
+    "iter_trainset": ".data",
+    "exact_match_metric": ".metrics",
+}
+
+__all__ = ["CITATION_CLASSES", *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
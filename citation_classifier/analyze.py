@@ -0,0 +1,395 @@
+import glob
+import json
+import math
+import re
+from datetime import datetime
+
+# Telemetri (JSONL) ve eski DSPy_Log_* metin loglarını tek geçişte, sabit bellekle özetler: maliyet, gecikme
+# yüzdelikleri, aşama başına çağrılar ve deneme başına skorlar. Gecikmeler tek tek saklanmaz, logaritmik
+# kovalara sayılır (göreli hata ~%1); dosyalar satır satır okunur.
+
+DEFAULT_LOG_GLOB = "logs/DSPy_Log_*"
+MAX_INTENT_LABELS = 32
+# LM gerektirmeyen alt komut; cli LM argümanlarını eklemez
+USES_LM = False
+
+_LOG_TIMESTAMP = re.compile(r"(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) (?:INFO|WARNING|ERROR|DEBUG) ")
+_STEP = re.compile(r"==> STEP (\d)")
+_TRIAL = re.compile(r"=+ Trial (\d+) / (\d+)(?: - (Minibatch|Full Evaluation of Default Program|Full Evaluation))? =+")
+_DEFAULT_SCORE = re.compile(r"Default program score: ([\d.]+)")
+_MINIBATCH_SCORE = re.compile(r"Score: ([\d.]+) on minibatch of size (\d+) with parameters (\[.*?\])")
+_FULL_SCORE = re.compile(r"Score: ([\d.]+) with parameters (\[.*?\])")
+_FULL_EVAL_SCORES = re.compile(r"Full eval scores so far: \[([\d., ]*)\]")
+_EVAL_RESULT = re.compile(r"dspy\.evaluate\.evaluate: Average Metric: ([\d.]+) / (\d+)")
+_PROGRESS_DONE = re.compile(r"(\d+)/\1 \[(?:(\d+):)?(\d+):(\d+)<")
+_BOOTSTRAP_ATTEMPTS = re.compile(r"amounting to (\d+) attempts")
+_RUN_SETTINGS = re.compile(r"RUNNING WITH THE FOLLOWING (\w+) AUTO RUN SETTINGS")
+_WARNING = re.compile(r" (WARNING|ERROR) ([\w.]+): ")
+
+STEP_STAGES = {"1": "bootstrap", "2": "propose", "3": "trial"}
+
+
+class MiproLogParser:
+    """MIPROv2 / dspy log satırlarını satır satır olaylara çevirir; yalnızca o anki aşamayı tutar (sabit bellek)."""
+
+    def __init__(self):
+        self.stage = None
+        self.trial = None
+        self.trial_kind = None
+        self.timestamp = None
+        self._last_progress = None
+
+    def feed(self, line):
+        events = []
+        match = _LOG_TIMESTAMP.search(line)
+        if match:
+            self.timestamp = match.group(1)
+
+        match = _RUN_SETTINGS.search(line)
+        if match:
+            events.append({"event": "run", "auto": match.group(1).lower()})
+        match = _STEP.search(line)
+        if match:
+            self.stage, self.trial, self.trial_kind = STEP_STAGES.get(match.group(1), "trial"), None, None
+            events.append({"event": "stage", "stage": self.stage, "trial": None, "timestamp": self.timestamp})
+        match = _TRIAL.search(line)
+        if match:
+            kind = {"Minibatch": "minibatch", "Full Evaluation of Default Program": "default"}.get(match.group(3), "full")
+            self.stage, self.trial, self.trial_kind = "trial", int(match.group(1)), kind
+            events.append({"event": "stage", "stage": "trial", "trial": self.trial, "kind": kind,
+                           "num_trials": int(match.group(2)), "timestamp": self.timestamp})
+
+        score = None
+        match = _DEFAULT_SCORE.search(line)
+        if match:
+            score = {"score": float(match.group(1)), "kind": "default"}
+        if score is None:
+            match = _MINIBATCH_SCORE.search(line)
+            if match:
+                score = {"score": float(match.group(1)), "kind": "minibatch", "batch_size": int(match.group(2)),
+                         "params": match.group(3)}
+        if score is None:
+            match = _FULL_SCORE.search(line)
+            if match:
+                score = {"score": float(match.group(1)), "kind": "full", "params": match.group(2)}
+        if score is None and self.trial_kind == "full":
+            # minibatch modunda tam değerlendirme skoru yalnızca "Full eval scores so far" listesinin sonunda görünür
+            match = _FULL_EVAL_SCORES.search(line)
+            if match and match.group(1).strip():
+                score = {"score": float(match.group(1).split(",")[-1]), "kind": "full"}
+        if score is not None:
+            events.append({"event": "score", "trial": self.trial, "timestamp": self.timestamp, **score})
+
+        match = _EVAL_RESULT.search(line)
+        if match:
+            events.append({"event": "eval", "stage": self.stage, "trial": self.trial,
+                           "correct": float(match.group(1)), "total": int(match.group(2))})
+        # tqdm aynı çubuğun birçok hâlini yazar; yalnızca tamamlanmış hâli (n/n), bir kez alınır
+        for done in _PROGRESS_DONE.finditer(line):
+            hours, minutes, seconds = done.group(2), done.group(3), done.group(4)
+            elapsed = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+            progress = (self.stage, self.trial, int(done.group(1)), elapsed)
+            if progress == self._last_progress:
+                continue
+            self._last_progress = progress
+            events.append({"event": "progress", "stage": self.stage, "trial": self.trial,
+                           "items": int(done.group(1)), "elapsed_s": elapsed})
+        match = _BOOTSTRAP_ATTEMPTS.search(line)
+        if match:
+            events.append({"event": "bootstrap", "attempts": int(match.group(1))})
+        match = _WARNING.search(line)
+        if match:
+            events.append({"event": "warning", "level": match.group(1), "logger": match.group(2)})
+        return events
+
+
+class LatencyHistogram:
+    """Logaritmik kovalı histogram; bellek kullanımı örnek sayısından bağımsızdır."""
+
+    GROWTH = 1.02
+    MIN_VALUE = 1e-4
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        value = max(float(value), self.MIN_VALUE)
+        index = int(math.log(value / self.MIN_VALUE, self.GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Kovanın orta noktası
+                return min(self.max, self.MIN_VALUE * self.GROWTH ** (index + 0.5))
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = LatencyHistogram()
+
+
+class TrialStats:
+    def __init__(self, trial):
+        self.trial = trial
+        self.kind = None
+        self.scores = []
+        self.calls = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def touch(self, ts):
+        if ts is None:
+            return
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+
+class TelemetrySummary:
+    def __init__(self, source, kind):
+        self.source = source
+        self.kind = kind
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.warnings = 0
+        self.latency = LatencyHistogram()
+        self.stages = {}
+        self.trials = {}
+        self.intents = {}
+        self._current_trial = None
+
+    def _stage(self, name):
+        return self.stages.setdefault(name or "bilinmiyor", StageStats())
+
+    def _trial(self, trial):
+        if trial not in self.trials:
+            self.trials[trial] = TrialStats(trial)
+        return self.trials[trial]
+
+    def _count_intent(self, intent):
+        for label in intent if isinstance(intent, list) else [intent]:
+            if label is None:
+                continue
+            label = str(label).strip().lower()
+            if label not in self.intents and len(self.intents) >= MAX_INTENT_LABELS:
+                label = "(diğer)"
+            self.intents[label] = self.intents.get(label, 0) + 1
+
+    def add(self, event):
+        kind = event.get("event", "lm_call")
+        ts = event.get("ts")
+        if kind == "lm_call":
+            self._add_call(event)
+        elif kind == "stage" and event.get("trial") is not None:
+            # Metin loglarında denemenin süresi bir sonraki denemenin başlangıcına kadar sayılır
+            if self._current_trial is not None:
+                self._trial(self._current_trial).touch(ts)
+            self._current_trial = event["trial"]
+            trial = self._trial(event["trial"])
+            trial.kind = event.get("kind")
+            trial.touch(ts)
+        elif kind == "score":
+            trial = self._trial(event.get("trial"))
+            trial.kind = trial.kind or event.get("kind")
+            trial.scores.append(event["score"])
+            trial.touch(ts)
+        elif kind == "eval" and self.kind == "log":
+            # Metin loglarında çağrı sayısı değerlendirilen örnek sayısından tahmin edilir (örnek başına bir çağrı)
+            self.calls += event["total"]
+            self._stage(event.get("stage")).calls += event["total"]
+            if event.get("trial") is not None:
+                self._trial(event["trial"]).calls += event["total"]
+        elif kind == "progress":
+            # Değerlendirme duvar süresinin örnek sayısına oranı (thread'ler nedeniyle tek çağrı gecikmesinden kısadır)
+            per_item = event["elapsed_s"] / max(1, event["items"])
+            self.latency.add(per_item)
+            self._stage(event.get("stage")).latency.add(per_item)
+        elif kind == "bootstrap":
+            self.calls += event["attempts"]
+            self._stage("bootstrap").calls += event["attempts"]
+        elif kind == "warning":
+            self.warnings += 1
+
+    def _add_call(self, event):
+        stage = self._stage(event.get("stage"))
+        ok = event.get("status", "ok") == "ok"
+        prompt_tokens = event.get("prompt_tokens") or 0
+        completion_tokens = event.get("completion_tokens") or 0
+        self.calls += 1
+        stage.calls += 1
+        self.errors += not ok
+        stage.errors += not ok
+        self.cache_hits += bool(event.get("cache_hit"))
+        stage.cache_hits += bool(event.get("cache_hit"))
+        self.retries += event.get("retries") or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        stage.prompt_tokens += prompt_tokens
+        stage.completion_tokens += completion_tokens
+        self.cost += event.get("cost") or 0.0
+        if event.get("latency_s") is not None:
+            self.latency.add(event["latency_s"])
+            stage.latency.add(event["latency_s"])
+        if event.get("trial") is not None:
+            trial = self._trial(event["trial"])
+            trial.calls += 1
+            trial.touch(event.get("ts"))
+        self._count_intent(event.get("intent"))
+
+    def to_dict(self):
+        def latency(h):
+            return {"count": h.count, "mean": h.mean(), "p50": h.percentile(50), "p90": h.percentile(90),
+                    "p99": h.percentile(99), "max": h.max if h.count else None}
+
+        return {
+            "source": self.source,
+            "kind": self.kind,
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": round(self.cost, 6),
+            "warnings": self.warnings,
+            "latency_s": latency(self.latency),
+            "stages": {
+                name: {"calls": s.calls, "errors": s.errors, "cache_hits": s.cache_hits,
+                       "prompt_tokens": s.prompt_tokens, "completion_tokens": s.completion_tokens,
+                       "latency_s": latency(s.latency)}
+                for name, s in self.stages.items()
+            },
+            "trials": [
+                {"trial": t.trial, "kind": t.kind, "scores": t.scores, "calls": t.calls,
+                 "duration_s": round(t.last_ts - t.first_ts, 1) if t.first_ts is not None else None}
+                for t in sorted(self.trials.values(), key=lambda t: (t.trial is None, t.trial or 0))
+            ],
+            "intents": self.intents,
+        }
+
+    def report(self):
+        d = self.to_dict()
+        source_kind = "telemetri" if self.kind == "telemetry" else "metin logu, geriye dönük"
+        print(f"'{self.source}' ({source_kind}):")
+        estimated = " (tahmini: değerlendirilen örnekler + bootstrap denemeleri)" if self.kind == "log" else ""
+        print(f"  LM çağrısı: {d['calls']}{estimated}, hata: {d['errors']}, uyarı: {d['warnings']}, "
+              f"önbellek isabeti: {d['cache_hits']}, yeniden deneme: {d['retries']}")
+        if self.kind == "telemetry":
+            print(f"  Token: prompt {d['prompt_tokens']}, tamamlama {d['completion_tokens']}, maliyet ${d['cost']:.4f}")
+        else:
+            print("  Token/maliyet: metin loglarında bulunmuyor")
+        latency_label = "Gecikme (çağrı başına)" if self.kind == "telemetry" else "Örnek başına değerlendirme süresi"
+        print(f"  {latency_label}: {_format_latency(d['latency_s'])}")
+        print("  Aşama            çağrı    hata   p50_sn   p95_sn")
+        for name, s in d["stages"].items():
+            h = self.stages[name].latency
+            print(f"  {name:<16} {s['calls']:<8} {s['errors']:<6} {_fmt(h.percentile(50)):<8} {_fmt(h.percentile(95))}")
+        if d["trials"]:
+            print("  Deneme   tür        skor            çağrı    süre_sn")
+            for t in d["trials"]:
+                scores = ", ".join(f"{s:.2f}" for s in t["scores"]) or "-"
+                print(f"  {str(t['trial']):<8} {str(t['kind']):<10} {scores:<15} {t['calls']:<8} {_fmt(t['duration_s'])}")
+        if d["intents"]:
+            intents = ", ".join(f"{k}: {v}" for k, v in sorted(d["intents"].items(), key=lambda kv: -kv[1]))
+            print(f"  Ayrıştırılan intent dağılımı: {intents}")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def _format_latency(latency):
+    if not latency["count"]:
+        return "-"
+    return (f"p50 {_fmt(latency['p50'])} sn, p90 {_fmt(latency['p90'])} sn, p99 {_fmt(latency['p99'])} sn, "
+            f"en fazla {_fmt(latency['max'])} sn ({latency['count']} ölçüm)")
+
+
+def _log_timestamp(value):
+    return datetime.strptime(value, "%Y/%m/%d %H:%M:%S").timestamp() if value else None
+
+
+def iter_telemetry_events(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_log_events(path):
+    parser = MiproLogParser()
+    # Metin modunda \r de satır sonu sayılır; tqdm'in aynı satıra yazdığı ilerleme hâlleri ayrı satırlar olur
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            for event in parser.feed(line):
+                event["ts"] = _log_timestamp(event.pop("timestamp", None) or parser.timestamp)
+                yield event
+
+
+def detect_kind(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip():
+                return "telemetry" if line.lstrip().startswith("{") else "log"
+    return "log"
+
+
+def analyze_file(path):
+    kind = detect_kind(path)
+    summary = TelemetrySummary(path, kind)
+    events = iter_telemetry_events(path) if kind == "telemetry" else iter_log_events(path)
+    for event in events:
+        summary.add(event)
+    return summary
+
+
+def add_arguments(parser):
+    parser.add_argument("paths", nargs="*", help=f"Telemetri JSONL veya metin log dosyaları (varsayılan: {DEFAULT_LOG_GLOB})")
+    parser.add_argument("--json", dest="json_output", help="Özetleri bu JSON dosyasına da yaz")
+    return parser
+
+
+def run(args):
+    paths = []
+    for pattern in args.paths or [DEFAULT_LOG_GLOB]:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    summaries = []
+    for path in paths:
+        summary = analyze_file(path)
+        summary.report()
+        summaries.append(summary.to_dict())
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2, ensure_ascii=False)
+        print(f"Özetler '{args.json_output}' dosyasına kaydedildi.")
+    return 0
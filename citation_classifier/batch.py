@@ -0,0 +1,261 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Toplu sınıflandırma: CSV satırlarını eşzamanlı olarak program.forward üzerinden geçirir,
+# sonuçları bittikçe JSONL dosyasına yazar. Çıktı dosyası aynı zamanda ilerleme kaydıdır;
+# yarıda kalan bir iş aynı çıktı dosyasıyla yeniden başlatıldığında tamamlanmış satırlar atlanır, hatalı
+# kalan satırlar yeniden denenir.
+
+
+def row_key(row, index):
+    citation_id = row.get("citation_id")
+    if citation_id is not None and str(citation_id).strip() != "":
+        return str(citation_id).strip()
+    return f"row-{index}"
+
+
+def _iter_records(output_path):
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line, json.loads(line)
+            except json.JSONDecodeError:
+                # Kesintide yarım yazılmış son satır olabilir, yok say
+                yield line, None
+
+
+def load_completed_keys(output_path):
+    """Başarılı kayıtların anahtarlarını döndürür; hatalı kayıtlar bekleyen sayılır ve yeniden denenir.
+
+    Çıktıda hatalı, yarım veya tekrarlanan satır varsa dosya yalnızca her anahtarın ilk başarılı kaydıyla yeniden
+    yazılır; böylece yeniden denenen satırın eski hata kaydı, yeni sonucun yanında kalmaz.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    stale = 0
+    for _, record in _iter_records(output_path):
+        if record is not None and record.get("status") == "ok" and record["key"] not in completed:
+            completed.add(record["key"])
+        else:
+            stale += 1
+    if stale:
+        tmp_path = output_path + ".tmp"
+        written = set()
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for line, record in _iter_records(output_path):
+                if record is not None and record.get("status") == "ok" and record["key"] not in written:
+                    written.add(record["key"])
+                    out.write(line + "\n")
+        os.replace(tmp_path, output_path)
+        print(f"'{output_path}' sıkıştırıldı: {stale} hatalı/yarım/tekrarlanan kayıt çıkarıldı, "
+              f"bu satırlar yeniden sınıflandırılacak.")
+    return completed
+
+
+def iter_pending_rows(csv_path, completed_keys):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for index, row in enumerate(reader):
+            key = row_key(row, index)
+            if key in completed_keys:
+                continue
+            yield key, row
+
+
+def build_record(key, row, prediction=None, error=None, latency_s=0.0):
+    record = {"key": key, "citation_id": row.get("citation_id")}
+    if error is None:
+        record["intent"] = str(getattr(prediction, "intent", "")).strip().lower()
+        record["reasoning"] = getattr(prediction, "reasoning", None)
+        record["route"] = getattr(prediction, "route", "llm")
+        record["status"] = "ok"
+    else:
+        record["status"] = "error"
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["latency_s"] = round(latency_s, 4)
+    if row.get("citation_intent"):
+        record["gold"] = row["citation_intent"]
+    return record
+
+
+def classify_row(program, key, row):
+    start = time.perf_counter()
+    try:
+        prediction = program.forward(citation=row["citation_context"], section=row["section"])
+    except Exception as e:
+        return build_record(key, row, error=e, latency_s=time.perf_counter() - start)
+    return build_record(key, row, prediction=prediction, latency_s=time.perf_counter() - start)
+
+
+def pack_items(rows):
+    return [(row["citation_context"], row["section"]) for _, row in rows]
+
+
+def classify_pack(program, rows):
+    # program.forward_many ile birden çok satır tek LM isteğinde sınıflandırılır (PackedClassifyCitation)
+    start = time.perf_counter()
+    try:
+        predictions = program.forward_many(pack_items(rows))
+    except Exception as e:
+        latency = (time.perf_counter() - start) / len(rows)
+        return [build_record(key, row, error=e, latency_s=latency) for key, row in rows]
+    return pack_records(rows, predictions, (time.perf_counter() - start) / len(rows))
+
+
+def pack_records(rows, predictions, latency):
+    records = []
+    for (key, row), prediction in zip(rows, predictions):
+        if prediction.intent is None:
+            records.append(build_record(key, row, error=ValueError(prediction.error), latency_s=latency))
+        else:
+            records.append(build_record(key, row, prediction=prediction, latency_s=latency))
+    return records
+
+
+def iter_packs(pending_rows, pack_size):
+    pack = []
+    for key, row in pending_rows:
+        pack.append((key, row))
+        if len(pack) == pack_size:
+            yield pack
+            pack = []
+    if pack:
+        yield pack
+
+
+def run_batch(program, input_csv, output_path, workers=8, max_in_flight=None, log_every=100, pack_size=None):
+    completed_keys = load_completed_keys(output_path)
+    if completed_keys:
+        print(f"Devam ediliyor: '{output_path}' içinde {len(completed_keys)} tamamlanmış satır bulundu, bunlar atlanacak.")
+
+    # Bellekte 50k future tutmamak için aynı anda kuyrukta bekleyen iş sayısı sınırlandırılır
+    max_in_flight = max_in_flight or workers * 4
+    summary = {"ok": 0, "error": 0, "skipped": len(completed_keys), "wall_s": 0.0}
+    started = time.perf_counter()
+    next_log = log_every
+    pending_rows = iter_pending_rows(input_csv, completed_keys)
+    if pack_size:
+        jobs = ((classify_pack, (program, pack)) for pack in iter_packs(pending_rows, pack_size))
+    else:
+        jobs = ((classify_row, (program, key, row)) for key, row in pending_rows)
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    fn, fn_args = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(executor.submit(fn, *fn_args))
+
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                for record in result if isinstance(result, list) else [result]:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    summary[record["status"]] += 1
+            out.flush()
+
+            processed = summary["ok"] + summary["error"]
+            if log_every and processed >= next_log:
+                next_log += log_every
+                elapsed = time.perf_counter() - started
+                print(f"{processed} satır işlendi ({processed / elapsed:.2f} satır/sn, {summary['error']} hata)")
+
+    summary["wall_s"] = round(time.perf_counter() - started, 3)
+    print(f"Toplu sınıflandırma tamamlandı: {summary['ok']} başarılı, {summary['error']} hatalı, "
+          f"{summary['skipped']} önceden tamamlanmış, süre {summary['wall_s']} sn.")
+    return summary
+
+
+async def _classify_row_scheduled(scheduler, key, row):
+    start = time.perf_counter()
+    try:
+        prediction = await scheduler.submit(citation=row["citation_context"], section=row["section"])
+    except Exception as e:
+        return build_record(key, row, error=e, latency_s=time.perf_counter() - start)
+    return build_record(key, row, prediction=prediction, latency_s=time.perf_counter() - start)
+
+
+async def _classify_pack_scheduled(scheduler, rows):
+    # Planlayıcının call_fn'i program.forward_many'dir; paket tek istek olarak bütçelenir ve yeniden denenir
+    start = time.perf_counter()
+    try:
+        predictions = await scheduler.submit(items=pack_items(rows))
+    except Exception as e:
+        latency = (time.perf_counter() - start) / len(rows)
+        return [build_record(key, row, error=e, latency_s=latency) for key, row in rows]
+    return pack_records(rows, predictions, (time.perf_counter() - start) / len(rows))
+
+
+async def _run_batch_scheduled(scheduler, input_csv, output_path, max_in_flight, log_every, pack_size=None):
+    completed_keys = load_completed_keys(output_path)
+    if completed_keys:
+        print(f"Devam ediliyor: '{output_path}' içinde {len(completed_keys)} tamamlanmış satır bulundu, bunlar atlanacak.")
+
+    summary = {"ok": 0, "error": 0, "skipped": len(completed_keys), "wall_s": 0.0}
+    started = time.perf_counter()
+    next_log = log_every
+    pending_rows = iter_pending_rows(input_csv, completed_keys)
+    if pack_size:
+        jobs = (_classify_pack_scheduled(scheduler, pack) for pack in iter_packs(pending_rows, pack_size))
+    else:
+        jobs = (_classify_row_scheduled(scheduler, key, row) for key, row in pending_rows)
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    job = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(asyncio.create_task(job))
+
+            if not in_flight:
+                break
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                for record in result if isinstance(result, list) else [result]:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    summary[record["status"]] += 1
+            out.flush()
+
+            processed = summary["ok"] + summary["error"]
+            if log_every and processed >= next_log:
+                next_log += log_every
+                print(f"{processed} satır işlendi ({processed / (time.perf_counter() - started):.2f} satır/sn, "
+                      f"{summary['error']} hata, eşzamanlılık sınırı {scheduler.concurrency.limit:.1f})")
+
+    summary["wall_s"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_batch_scheduled(scheduler, input_csv, output_path, max_in_flight=None, log_every=100, pack_size=None):
+    # Eşzamanlılığı planlayıcı sınırlar; burada yalnızca bellekte bekleyen satır sayısı sınırlanır
+    max_in_flight = max_in_flight or scheduler.concurrency.maximum * 2
+    try:
+        summary = asyncio.run(_run_batch_scheduled(scheduler, input_csv, output_path, max_in_flight, log_every,
+                                                   pack_size))
+    finally:
+        scheduler.close()
+    print(f"Toplu sınıflandırma tamamlandı: {summary['ok']} başarılı, {summary['error']} hatalı, "
+          f"{summary['skipped']} önceden tamamlanmış, süre {summary['wall_s']} sn.")
+    scheduler.report()
+    return summary
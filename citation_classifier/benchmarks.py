@@ -0,0 +1,207 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from .config import CITATION_CLASSES, CSV_DEV_PATH, CSV_TRAIN_PATH, save_path
+
+# Sahte LM (fake_lm.FakeLM) üzerinde tekrarlanabilir performans ölçümleri.
+# Her ölçüm için duvar saati süresi, çağrı/sn, p50/p95 gecikme ve tepe bellek raporlanır;
+# sonuçlar commit'ler arası karşılaştırma için JSON olarak kaydedilir.
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name, fn, lm):
+    lm.reset_stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+    extra = fn() or {}
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = extra.pop("latencies", None) or lm.call_latencies
+    result = {
+        "wall_s": round(wall, 4),
+        "lm_calls": lm.calls,
+        "calls_per_s": round(lm.calls / wall, 2) if wall > 0 else 0.0,
+        "p50_latency_s": round(percentile(latencies, 0.50), 5),
+        "p95_latency_s": round(percentile(latencies, 0.95), 5),
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+        "prompt_tokens": lm.prompt_tokens,
+        "completion_tokens": lm.completion_tokens,
+        **extra,
+    }
+    print(f"[{name}] {result['wall_s']} sn, {result['lm_calls']} LM çağrısı, "
+          f"p50 {result['p50_latency_s']} sn, p95 {result['p95_latency_s']} sn, tepe bellek {result['peak_memory_mb']} MB")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_benchmarks(program_factory, load_fn, metric, train_csv, dev_csv, citation_classes, lm, program_path=None,
+                   forward_calls=50, batch_workers=8, eval_threads=8, mipro_trials=3, repeats=3,
+                   skip=()):
+    import dspy
+
+    def new_program():
+        program = program_factory()
+        if program_path and os.path.exists(program_path):
+            program.load(program_path)
+        return program
+
+    devset = load_fn(csv_path=dev_csv, citation_classes=citation_classes, get_all_samples=True)
+    results = {}
+
+    def bench_loading():
+        for _ in range(repeats):
+            load_fn(csv_path=train_csv, citation_classes=citation_classes, get_all_samples=True)
+            load_fn(csv_path=dev_csv, citation_classes=citation_classes, get_all_samples=True)
+            load_fn(csv_path=train_csv, citation_classes=citation_classes, get_all_samples=False,
+                    samples_per_class=2, random_state_val=42)
+        return {"repeats": repeats}
+
+    def bench_single_forward():
+        program = new_program()
+        latencies = []
+        for example in devset[:forward_calls]:
+            start = time.perf_counter()
+            program.forward(citation=example.citation, section=example.section)
+            latencies.append(time.perf_counter() - start)
+        return {"latencies": latencies, "forward_calls": len(latencies)}
+
+    def bench_batch():
+        from .batch import run_batch
+
+        program = new_program()
+        with tempfile.TemporaryDirectory() as tmp:
+            summary = run_batch(program, dev_csv, os.path.join(tmp, "predictions.jsonl"),
+                                workers=batch_workers, log_every=0)
+        return {"rows": summary["ok"] + summary["error"], "errors": summary["error"], "workers": batch_workers}
+
+    def bench_evaluate():
+        program = new_program()
+        evaluator = dspy.Evaluate(devset=devset, metric=metric, num_threads=eval_threads,
+                                  display_progress=False, display_table=False)
+        score = evaluator(program)
+        return {"score": float(score), "examples": len(devset), "threads": eval_threads}
+
+    def bench_mipro():
+        from dspy.teleprompt import MIPROv2
+
+        trainset = load_fn(csv_path=train_csv, citation_classes=citation_classes, get_all_samples=False,
+                           samples_per_class=4, random_state_val=42)
+        optimizer = MIPROv2(metric=metric, auto=None, num_candidates=2, num_threads=eval_threads, verbose=False)
+        compiled = optimizer.compile(
+            student=program_factory(), trainset=trainset, valset=devset[:40], num_trials=mipro_trials,
+            max_bootstrapped_demos=2, max_labeled_demos=0, minibatch=False, requires_permission_to_run=False,
+        )
+        return {"trials": mipro_trials, "demos": len(compiled.classifier.predict.demos)}
+
+    def bench_packing():
+        from .cascade import read_labeled_rows
+        from .packing import sweep_pack_sizes
+
+        return {"pack_sizes": sweep_pack_sizes(lm, read_labeled_rows(dev_csv), program_path=program_path)}
+
+    benches = [
+        ("dataset_loading", bench_loading),
+        ("single_forward", bench_single_forward),
+        ("batch_classification", bench_batch),
+        ("devset_evaluation", bench_evaluate),
+        ("mipro_compile_short", bench_mipro),
+        ("multi_citation_packing", bench_packing),
+    ]
+    for name, fn in benches:
+        if name in skip:
+            continue
+        results[name] = measure(name, fn, lm)
+
+    return {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "dspy_version": str(dspy.__version__),
+            "fake_lm": lm.config(),
+        },
+        "results": results,
+    }
+
+
+def save_results(report, output_dir="benchmark_results"):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"bench_{report['meta']['git_commit']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Benchmark sonuçları '{path}' dosyasına kaydedildi.")
+    return path
+
+
+def compare_results(baseline_path, report, metrics=("wall_s", "p95_latency_s", "peak_memory_mb")):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"Karşılaştırma: {baseline['meta']['git_commit']} -> {report['meta']['git_commit']}")
+    for name, current in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        changes = []
+        for metric_name in metrics:
+            old, new = previous.get(metric_name), current.get(metric_name)
+            if old:
+                changes.append(f"{metric_name} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {name}: " + ", ".join(changes))
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Ölçümlerde kullanılacak program dosyası")
+    parser.add_argument("--workers", type=int, default=8, help="Toplu sınıflandırma ölçümünde iş parçacığı sayısı")
+    parser.add_argument("--output-dir", default="benchmark_results", help="JSON sonuçlarının kaydedileceği klasör")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki benchmark JSON dosyası")
+    parser.add_argument("--skip", nargs="*", default=[], help="Atlanacak ölçümler (ör. mipro_compile_short)")
+    return parser
+
+
+def run(args):
+    from .data import load_and_prepare_trainset
+    from .lm import build_lm
+    from .metrics import exact_match_metric
+    from .program import ClassifyCitation
+
+    # Ölçümler her zaman sahte LM ile yapılır
+    args.fake_lm = True
+    lm, _ = build_lm(args)
+    report = run_benchmarks(
+        program_factory=ClassifyCitation,
+        load_fn=load_and_prepare_trainset,
+        metric=exact_match_metric,
+        train_csv=CSV_TRAIN_PATH,
+        dev_csv=CSV_DEV_PATH,
+        citation_classes=CITATION_CLASSES,
+        lm=lm,
+        program_path=args.program,
+        batch_workers=args.workers,
+        skip=set(args.skip),
+    )
+    save_results(report, args.output_dir)
+    if args.compare:
+        compare_results(args.compare, report)
+    return 0
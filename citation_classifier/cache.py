@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import dspy
+
+# LM yanıtları için kalıcı (SQLite) önbellek. Anahtar: model adı + gönderilen mesajların tamamı +
+# örnekleme parametreleri. Toplam boyut max_bytes'ı aşınca en uzun süredir kullanılmayan kayıtlar silinir (LRU).
+# Aynı dosyayı birden çok süreç paylaşabilir (ör. optimize --processes): toplam boyut her yazmada veritabanından
+# okunur, isabetlerin last_access güncellemeleri ise okuma yoluna yazma işlemi eklememek için toplu yazılır.
+
+# Yanıtı etkilemeyen (önbellek, yeniden deneme, taşıma ayarları), anahtara girmemesi gereken parametreler
+NON_KEY_PARAMS = {
+    "cache", "cache_in_memory", "num_retries", "callbacks", "timeout", "request_timeout",
+    "base_url", "extra_headers", "headers", "metadata",
+}
+# Başka süreç yazarken "database is locked" yerine beklenecek süre
+BUSY_TIMEOUT_S = 30.0
+# Bu kadar isabetin last_access güncellemesi biriktiğinde (veya bir sonraki put'ta) tek işlemde yazılır
+ACCESS_FLUSH_EVERY = 64
+
+
+def make_cache_key(model, messages, params):
+    key_params = {
+        k: v for k, v in params.items()
+        if k not in NON_KEY_PARAMS and not k.startswith("api_")
+    }
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": key_params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LMResponseCache:
+    def __init__(self, path="lm_cache.sqlite", max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._pending_access = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: işlemler aşağıda BEGIN IMMEDIATE ile açıkça yönetilir
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_S * 1000)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+
+    def __deepcopy__(self, memo):
+        # dspy LM nesnelerini kopyaladığında (ör. lm.copy) önbellek paylaşılmaya devam etsin
+        return self
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_access[key] = time.time()
+            if len(self._pending_access) >= ACCESS_FLUSH_EVERY:
+                self._write_locked()
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        blob = pickle.dumps(value)
+        with self._lock:
+            self._write_locked((key, blob))
+
+    def _write_locked(self, entry=None):
+        # BEGIN IMMEDIATE yazma kilidini baştan alır; toplam boyut okuması ve çıkarma diğer süreçlerin
+        # yazmalarıyla aynı sırada görülür
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._pending_access:
+                self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                       [(accessed, key) for key, accessed in self._pending_access.items()])
+            if entry is not None:
+                key, blob = entry
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time()),
+                )
+                self._evict_locked()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending_access.clear()
+
+    def _total_bytes_locked(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict_locked(self):
+        excess = self._total_bytes_locked() - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self.size_bytes(),
+        }
+
+    def size_bytes(self):
+        with self._lock:
+            return self._total_bytes_locked()
+
+    def flush(self):
+        with self._lock:
+            if self._pending_access:
+                self._write_locked()
+
+    def report(self):
+        self.flush()
+        s = self.stats()
+        print(f"LM önbelleği: {s['hits']} isabet, {s['misses']} ıskalama (isabet oranı %{s['hit_rate'] * 100:.1f}), "
+              f"{s['evictions']} kayıt çıkarıldı, boyut {s['size_bytes'] / (1024 * 1024):.1f} MB ('{self.path}')")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLM(dspy.LM):
+    """dspy.LM'in önünde LMResponseCache kullanan LM. Önbellekte bulunan istekler API'ye gönderilmez."""
+
+    def __init__(self, model, response_cache, **kwargs):
+        super().__init__(model, **kwargs)
+        self.response_cache = response_cache
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        request_messages = messages or [{"role": "user", "content": prompt}]
+        key = make_cache_key(self.model, request_messages, {**self.kwargs, **kwargs})
+        response = self.response_cache.get(key)
+        if response is not None:
+            # litellm'in kendi önbelleğiyle aynı işaret; telemetri isabetleri buradan okur
+            if isinstance(getattr(response, "_hidden_params", None), dict):
+                response._hidden_params["cache_hit"] = True
+            return response
+        response = super().forward(prompt=prompt, messages=messages, **kwargs)
+        self.response_cache.put(key, response)
+        return response
@@ -0,0 +1,259 @@
+import csv
+import os
+from collections import Counter
+import threading
+import time
+
+from .config import CASCADE_MODEL_PATH, CSV_DEV_PATH, CSV_TRAIN_PATH, save_path
+
+# LM önünde çalışan ucuz, yalnızca CPU kullanan ön sınıflandırıcı (kaskad).
+# trainset.csv üzerinde citation_context (karakter n-gram TF-IDF) + section özellikleriyle eğitilen
+# lojistik regresyon; kalibre edilmiş güveni eşiğin üzerindeyse doğrudan cevap verir, değilse LM'e devreder.
+
+DEFAULT_THRESHOLD = 0.85
+SWEEP_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98]
+
+
+def normalize_section(section):
+    # Türkçe büyük İ/I harfleri str.lower() ile doğru küçülmez
+    return str(section).replace("İ", "i").replace("I", "ı").lower().strip()
+
+
+def citation_texts(pairs):
+    return [str(citation) for citation, _ in pairs]
+
+
+def section_texts(pairs):
+    return [normalize_section(section) for _, section in pairs]
+
+
+def read_labeled_rows(csv_path):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return [
+            (row["citation_context"], row["section"], row["citation_intent"].strip().lower())
+            for row in csv.DictReader(f)
+        ]
+
+
+def train_preclassifier(csv_path=CSV_TRAIN_PATH, calibration_folds=3, random_state=42):
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import FeatureUnion, make_pipeline
+    from sklearn.preprocessing import FunctionTransformer
+
+    rows = read_labeled_rows(csv_path)
+    pairs = [(citation, section) for citation, section, _ in rows]
+    labels = [label for _, _, label in rows]
+
+    features = FeatureUnion([
+        ("citation", make_pipeline(
+            FunctionTransformer(citation_texts),
+            TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), min_df=2, sublinear_tf=True),
+        )),
+        ("section", make_pipeline(
+            FunctionTransformer(section_texts),
+            TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+        )),
+    ])
+    classifier = LogisticRegression(C=10.0, max_iter=2000, class_weight="balanced", random_state=random_state)
+
+    # Çapraz doğrulamalı kalibrasyon her sınıfta en az `calibration_folds` örnek ister (ör. trainset'te 'differ' tek örnek).
+    # Kalibrasyon atlanmaz; bu kadar örneği olmayan sınıflar ön sınıflandırıcının eğitiminden çıkarılır. Yerel model bu
+    # sınıfların olasılığını kalan sınıflara dağıttığı için, çıkarılan örneklerin tahmin edildiği sınıflar
+    # (confusable_classes_) modelle birlikte saklanır ve kaskad bu sınıflardaki yerel cevapları her zaman LM'e devreder.
+    counts = Counter(labels)
+    excluded = sorted(label for label, count in counts.items() if count < calibration_folds)
+    excluded_pairs = [pair for pair, label in zip(pairs, labels) if label in excluded]
+    if excluded:
+        print(f"Uyarı: {', '.join(f'{label} ({counts[label]} örnek)' for label in excluded)} sınıf(lar)ında kalibrasyon için "
+              f"gereken {calibration_folds} örnek yok; bu sınıflar ön sınıflandırıcıdan çıkarıldı.")
+        kept = [i for i, label in enumerate(labels) if label not in excluded]
+        pairs = [pairs[i] for i in kept]
+        labels = [labels[i] for i in kept]
+
+    classifier = CalibratedClassifierCV(classifier, method="sigmoid", cv=calibration_folds)
+    model = make_pipeline(features, classifier)
+    model.fit(pairs, labels)
+    model.excluded_classes_ = excluded
+    model.confusable_classes_ = sorted({str(label) for label in model.predict(excluded_pairs)}) if excluded_pairs else []
+    if model.confusable_classes_:
+        print(f"Çıkarılan sınıfların örnekleri yerel modelde {', '.join(model.confusable_classes_)} olarak tahmin "
+              f"ediliyor; bu sınıflardaki yerel cevaplar LM'e devredilecek.")
+    return model
+
+
+def save_preclassifier(model, path=CASCADE_MODEL_PATH):
+    import joblib
+
+    joblib.dump(model, path)
+    print(f"Ön sınıflandırıcı '{path}' dosyasına kaydedildi.")
+
+
+def load_or_train_preclassifier(path=CASCADE_MODEL_PATH, train_csv=CSV_TRAIN_PATH, retrain=False):
+    import joblib
+
+    # Eğitim verisi modelden yeniyse veya model çıkarılan sınıf bilgisini taşımıyorsa (eski sürüm) yeniden eğitilir
+    if not retrain and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(train_csv):
+        model = joblib.load(path)
+        if hasattr(model, "confusable_classes_"):
+            return model
+    model = train_preclassifier(train_csv)
+    save_preclassifier(model, path)
+    return model
+
+
+class CascadeClassifier:
+    """Ön sınıflandırıcı yeterince eminse onun cevabını, değilse LM programının cevabını döndürür."""
+
+    def __init__(self, preclassifier, program, threshold=DEFAULT_THRESHOLD):
+        self.preclassifier = preclassifier
+        self.program = program
+        self.threshold = threshold
+        self.guarded_labels = set(getattr(preclassifier, "confusable_classes_", ()))
+        self.local_calls = 0
+        self.deferred_calls = 0
+        self.guarded_calls = 0
+        self._lock = threading.Lock()
+
+    def answers_locally(self, label, confidence):
+        return confidence >= self.threshold and label not in self.guarded_labels
+
+    def local_predict(self, citation, section):
+        probabilities = self.preclassifier.predict_proba([(citation, section)])[0]
+        best = probabilities.argmax()
+        return self.preclassifier.classes_[best], float(probabilities[best])
+
+    def forward(self, citation, section):
+        import dspy
+
+        label, confidence = self.local_predict(citation, section)
+        if self.answers_locally(label, confidence):
+            with self._lock:
+                self.local_calls += 1
+            return dspy.Prediction(intent=label, reasoning=f"Yerel ön sınıflandırıcı (güven {confidence:.3f})",
+                                   route="local", confidence=confidence)
+        with self._lock:
+            self.deferred_calls += 1
+            self.guarded_calls += confidence >= self.threshold
+        prediction = self.program.forward(citation=citation, section=section)
+        prediction.route = "llm"
+        prediction.confidence = confidence
+        return prediction
+
+    __call__ = forward
+
+    def forward_many(self, items):
+        # Paketlenmiş programlarla (PackedClassifyCitation) kullanım: yalnızca emin olunmayanlar LM'e gider
+        import dspy
+
+        probabilities = self.preclassifier.predict_proba(list(items))
+        predictions, deferred, guarded = [None] * len(items), [], 0
+        for i, row in enumerate(probabilities):
+            best = row.argmax()
+            confidence = float(row[best])
+            label = self.preclassifier.classes_[best]
+            if self.answers_locally(label, confidence):
+                predictions[i] = dspy.Prediction(intent=label, reasoning=f"Yerel ön sınıflandırıcı (güven {confidence:.3f})",
+                                                 route="local", confidence=confidence)
+            else:
+                deferred.append(i)
+                guarded += confidence >= self.threshold
+        with self._lock:
+            self.local_calls += len(items) - len(deferred)
+            self.deferred_calls += len(deferred)
+            self.guarded_calls += guarded
+        if deferred:
+            llm_predictions = self.program.forward_many([items[i] for i in deferred])
+            for i, prediction in zip(deferred, llm_predictions):
+                prediction.route = "llm"
+                predictions[i] = prediction
+        return predictions
+
+    def deferral_rate(self):
+        total = self.local_calls + self.deferred_calls
+        return self.deferred_calls / total if total else 0.0
+
+
+def sweep_thresholds(preclassifier, rows, thresholds=SWEEP_THRESHOLDS):
+    """Yalnızca yerel modelle (LM çağrısı yapmadan) eşik başına devretme oranı ve yerel yol doğruluğu.
+
+    Çıkarılan sınıflarla karışan sınıfların yerel cevapları devredilir (guarded); korumasız durumdaki yerel cevap
+    sayısı, doğruluğu ve çıkarılan sınıflara ait atıflardan kaçının yerelde yanlış etiketleneceği de raporlanır.
+    """
+    probabilities = preclassifier.predict_proba([(citation, section) for citation, section, _ in rows])
+    predicted = preclassifier.classes_[probabilities.argmax(axis=1)]
+    confidence = probabilities.max(axis=1)
+    gold = [label for _, _, label in rows]
+    guarded_labels = set(getattr(preclassifier, "confusable_classes_", ()))
+    excluded = set(getattr(preclassifier, "excluded_classes_", ()))
+    results = []
+    for threshold in thresholds:
+        unguarded = [i for i in range(len(rows)) if confidence[i] >= threshold]
+        answered = [i for i in unguarded if predicted[i] not in guarded_labels]
+        correct = sum(predicted[i] == gold[i] for i in answered)
+        unguarded_correct = sum(predicted[i] == gold[i] for i in unguarded)
+        results.append({
+            "threshold": threshold,
+            "deferral_rate": 1 - len(answered) / len(rows),
+            "local_answered": len(answered),
+            "local_accuracy": correct / len(answered) if answered else 0.0,
+            "guarded": len(unguarded) - len(answered),
+            "unguarded_deferral_rate": 1 - len(unguarded) / len(rows),
+            "unguarded_local_accuracy": unguarded_correct / len(unguarded) if unguarded else 0.0,
+            "excluded_mislabeled_unguarded": sum(gold[i] in excluded for i in unguarded),
+        })
+    return results
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Devredilen atıflar için kullanılacak program dosyası")
+    parser.add_argument("--devset", default=CSV_DEV_PATH, help="Raporlama için kullanılacak CSV dosyası")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Yerel cevap için gereken asgari güven")
+    parser.add_argument("--model-path", default=CASCADE_MODEL_PATH, help="Ön sınıflandırıcı model dosyası")
+    parser.add_argument("--retrain", action="store_true", help="Ön sınıflandırıcıyı yeniden eğit")
+    parser.add_argument("--sweep-only", action="store_true", help="Yalnızca eşik taramasını yap, LM çağrısı yapma")
+    return parser
+
+
+def run(args):
+    preclassifier = load_or_train_preclassifier(args.model_path, retrain=args.retrain)
+    rows = read_labeled_rows(args.devset)
+
+    print(f"Eşik taraması ('{args.devset}', {len(rows)} örnek, LM çağrısı yok):")
+    excluded = getattr(preclassifier, "excluded_classes_", [])
+    if excluded:
+        print(f"  Çıkarılan sınıflar: {', '.join(excluded)}; karışan sınıflar LM'e devredilir: "
+              f"{', '.join(preclassifier.confusable_classes_) or '-'}")
+    print("  eşik   devretme   yerel_cevap   yerel_doğruluk   korunan   | korumasız: devretme   yerel_doğruluk   "
+          "yanlış_çıkarılan")
+    for r in sweep_thresholds(preclassifier, rows):
+        print(f"  {r['threshold']:<6} %{r['deferral_rate'] * 100:<8.1f} {r['local_answered']:<13} "
+              f"%{r['local_accuracy'] * 100:<15.1f} {r['guarded']:<9} |            %{r['unguarded_deferral_rate'] * 100:<8.1f} "
+              f"%{r['unguarded_local_accuracy'] * 100:<15.1f} {r['excluded_mislabeled_unguarded']}")
+    if args.sweep_only:
+        return 0
+
+    from .lm import build_lm
+    from .optimize import load_program
+
+    _, response_cache = build_lm(args)
+    cascade = CascadeClassifier(preclassifier, load_program(args.program), threshold=args.threshold)
+    correct = {"local": 0, "llm": 0}
+    started = time.perf_counter()
+    for citation, section, gold in rows:
+        prediction = cascade.forward(citation=citation, section=section)
+        if str(getattr(prediction, "intent", "")).strip().lower() == gold:
+            correct[prediction.route] += 1
+    elapsed = time.perf_counter() - started
+
+    local_n, llm_n = cascade.local_calls, cascade.deferred_calls
+    print(f"Kaskad raporu (eşik {args.threshold}, {elapsed:.1f} sn):")
+    print(f"  Devretme oranı: %{cascade.deferral_rate() * 100:.1f} ({llm_n} LM çağrısı, {local_n} yerel cevap; "
+          f"{cascade.guarded_calls} atıf çıkarılan sınıflarla karışabileceği için devredildi)")
+    print(f"  Yerel yol doğruluğu: %{correct['local'] / local_n * 100 if local_n else 0:.1f}")
+    print(f"  LM yolu doğruluğu: %{correct['llm'] / llm_n * 100 if llm_n else 0:.1f}")
+    print(f"  Toplam doğruluk: %{(correct['local'] + correct['llm']) / len(rows) * 100:.1f}")
+    if response_cache is not None:
+        response_cache.report()
+    return 0
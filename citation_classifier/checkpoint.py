@@ -0,0 +1,356 @@
+import hashlib
+import json
+import os
+import shutil
+
+from dspy.teleprompt import MIPROv2
+
+# MIPROv2 optimizasyonunu diske yazarak ilerletir: bootstrap edilen demo kümeleri, önerilen talimatlar ve her aday
+# değerlendirmesinin skoru checkpoint dizinine kaydedilir. Yarıda kalan bir çalıştırma aynı ayarlarla yeniden
+# başlatıldığında adımlar 1-2 diskten yüklenir; Optuna (sabit tohumlu TPE) aynı denemeleri aynı sırayla önerdiği için
+# tamamlanmış denemeler LM çağrısı yapılmadan skorları diskten okunarak tekrar oynatılır ve arama kaldığı yerden sürer.
+
+RUN_FILE = "run.json"
+DEMOS_FILE = "demo_candidates.json"
+INSTRUCTIONS_FILE = "instruction_candidates.json"
+EVALUATIONS_FILE = "evaluations.jsonl"
+BEST_PROGRAM_FILE = "best_program.json"
+CHECKPOINT_FILES = [RUN_FILE, DEMOS_FILE, INSTRUCTIONS_FILE, EVALUATIONS_FILE, BEST_PROGRAM_FILE]
+# Başarıyla biten çalıştırmanın dosyaları buraya taşınır; sonraki çalıştırma (ör. kaydedilen program üzerinden) temiz başlar
+ARCHIVE_DIR = "last_run"
+
+
+def _jsonable(value):
+    return value.toDict() if hasattr(value, "toDict") else str(value)
+
+
+def fingerprint(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=_jsonable)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def example_key(example):
+    return fingerprint({"citation": example.get("citation"), "section": example.get("section")})
+
+
+class OptimizationCheckpoint:
+    def __init__(self, directory):
+        self.directory = directory
+        self.evaluations = {}
+        self.archive_dir = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def clear(self):
+        # Yalnızca checkpoint'in kendi dosyaları silinir, dizindeki başka dosyalara dokunulmaz
+        for name in CHECKPOINT_FILES:
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+        self.evaluations = {}
+
+    def archive(self):
+        """Tamamlanan çalıştırmanın dosyalarını ARCHIVE_DIR altına taşır (önceki arşivin yerine)."""
+        target = self.path(ARCHIVE_DIR)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+        for name in CHECKPOINT_FILES:
+            if os.path.exists(self.path(name)):
+                os.replace(self.path(name), os.path.join(target, name))
+        self.evaluations = {}
+        self.archive_dir = target
+        return target
+
+    def _read_json(self, name):
+        if not os.path.exists(self.path(name)):
+            return None
+        with open(self.path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, name, value):
+        # Önce geçici dosyaya yazılır; yazma sırasında kesilen bir çalıştırma yarım JSON bırakmaz
+        tmp_path = self.path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False, default=_jsonable)
+        os.replace(tmp_path, self.path(name))
+
+    def start(self, run_settings):
+        """Ayarlar önceki çalıştırmayla aynıysa kayıtlı değerlendirmeleri yükler; farklıysa hata verir."""
+        saved = self._read_json(RUN_FILE)
+        if saved is None:
+            self._write_json(RUN_FILE, run_settings)
+        elif saved != run_settings:
+            changed = sorted(k for k in set(saved) | set(run_settings) if saved.get(k) != run_settings.get(k))
+            raise ValueError(
+                f"'{self.directory}' içindeki checkpoint farklı ayarlarla oluşturulmuş (değişenler: {', '.join(changed)}). "
+                "Sıfırdan başlamak için --fresh kullanın veya başka bir --checkpoint-dir verin."
+            )
+
+        if os.path.exists(self.path(EVALUATIONS_FILE)):
+            truncated = False
+            with open(self.path(EVALUATIONS_FILE), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        truncated = True  # Kesilen çalıştırmanın yarım kalan son satırı
+                        continue
+                    self.evaluations[record["key"]] = record
+            if truncated:
+                # Yeni kayıtlar yarım satırın arkasına eklenmesin diye dosya geçerli kayıtlarla yeniden yazılır
+                with open(self.path(EVALUATIONS_FILE), "w", encoding="utf-8") as f:
+                    for record in self.evaluations.values():
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return len(self.evaluations)
+
+    def load_demo_candidates(self):
+        import dspy
+
+        saved = self._read_json(DEMOS_FILE)
+        if saved is None:
+            return None
+        demo_candidates = None
+        if saved["demo_candidates"] is not None:
+            demo_candidates = {
+                int(i): [[dspy.Example(**demo) for demo in demo_set] for demo_set in demo_sets]
+                for i, demo_sets in saved["demo_candidates"].items()
+            }
+        return demo_candidates, saved["rng_state"]
+
+    def save_demo_candidates(self, demo_candidates, rng_state):
+        self._write_json(DEMOS_FILE, {"demo_candidates": demo_candidates, "rng_state": rng_state})
+
+    def load_instruction_candidates(self):
+        saved = self._read_json(INSTRUCTIONS_FILE)
+        if saved is None:
+            return None
+        instruction_candidates = {int(i): candidates for i, candidates in saved["instruction_candidates"].items()}
+        return instruction_candidates, saved["rng_state"]
+
+    def save_instruction_candidates(self, instruction_candidates, rng_state):
+        self._write_json(INSTRUCTIONS_FILE, {"instruction_candidates": instruction_candidates, "rng_state": rng_state})
+
+    def record_evaluation(self, record):
+        self.evaluations[record["key"]] = record
+        with open(self.path(EVALUATIONS_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _rng_state_to_json(rng):
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def _restore_rng_state(rng, state):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+class CheckpointedEvaluate:
+    """MIPROv2'nin `evaluate` nesnesinin yerine geçer: skoru checkpoint'te olan aday/örnek kümesi tekrar değerlendirilmez.
+
+    racing verilirse tam valset değerlendirmeleri mevcut en iyi skora karşı yarıştırılır (bkz. racing.py).
+    """
+
+    def __init__(self, evaluate, checkpoint, valset_size, best_program_path=None, process_pool=None, racing=None):
+        self.evaluate = evaluate
+        self.checkpoint = checkpoint
+        self.valset_size = valset_size
+        self.best_program_path = best_program_path
+        self.process_pool = process_pool
+        self.racing = racing
+        self.reused = 0
+        self.evaluated = 0
+        self.best_full_score = None
+
+    def evaluate_examples(self, program, examples, **kwargs):
+        if self.process_pool is not None:
+            return self.process_pool(program, examples)
+        return self.evaluate(program, devset=examples, return_all_scores=True, **kwargs)
+
+    def __call__(self, program, devset=None, return_all_scores=False, **kwargs):
+        key = fingerprint({
+            "program": program.dump_state(),
+            "examples": [example_key(example) for example in devset],
+        })
+        record = self.checkpoint.evaluations.get(key) if self.checkpoint is not None else None
+        if record is not None:
+            self.reused += 1
+        else:
+            evaluated = len(devset)
+            full_valset = len(devset) == self.valset_size
+            if self.racing is not None and full_valset and self.best_full_score is not None:
+                score, scores, evaluated = self.racing(self.evaluate_examples, program, devset, self.best_full_score)
+            else:
+                score, scores = self.evaluate_examples(program, devset, **kwargs)
+            record = {"key": key, "num_examples": len(devset), "num_evaluated": evaluated, "score": score, "scores": scores}
+            if self.checkpoint is not None:
+                self.checkpoint.record_evaluation(record)
+            self.evaluated += 1
+
+        # Tam valset skorlarında en iyi program, çalıştırma bitmeden de diske yazılır
+        if len(devset) == self.valset_size and (self.best_full_score is None or record["score"] > self.best_full_score):
+            self.best_full_score = record["score"]
+            if self.best_program_path:
+                program.save(self.best_program_path)
+
+        if return_all_scores:
+            return record["score"], record["scores"]
+        return record["score"]
+
+
+class CheckpointedMIPROv2(MIPROv2):
+    """checkpoint=None ise yalnızca süreç havuzu ve/veya yarış (racing) için kullanılır, diske bir şey yazılmaz."""
+
+    def __init__(self, *args, checkpoint=None, process_pool=None, racing=None, run_settings=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkpoint = checkpoint
+        self.process_pool = process_pool
+        self.racing = racing
+        self.run_settings = run_settings or {}
+        self.checkpointed_evaluate = None
+
+    def compile(self, student, *, trainset, valset=None, **kwargs):
+        if self.checkpoint is None:
+            return super().compile(student, trainset=trainset, valset=valset, **kwargs)
+        run_settings = dict(self.run_settings)
+        run_settings.update({
+            "auto": self.auto,
+            "seed": kwargs.get("seed") or self.seed,
+            "max_bootstrapped_demos": kwargs.get("max_bootstrapped_demos"),
+            "max_labeled_demos": kwargs.get("max_labeled_demos"),
+            "student": fingerprint(student.dump_state()),
+            "trainset": fingerprint([example_key(example) for example in trainset]),
+            "valset": fingerprint([example_key(example) for example in valset or []]),
+        })
+        reused = self.checkpoint.start(run_settings)
+        if reused:
+            print(f"Checkpoint '{self.checkpoint.directory}' bulundu: {reused} aday değerlendirmesi yeniden kullanılacak.")
+        return super().compile(student, trainset=trainset, valset=valset, **kwargs)
+
+    def _bootstrap_fewshot_examples(self, program, trainset, seed, teacher):
+        if self.checkpoint is None:
+            return super()._bootstrap_fewshot_examples(program, trainset, seed, teacher)
+        saved = self.checkpoint.load_demo_candidates()
+        if saved is not None:
+            demo_candidates, rng_state = saved
+            _restore_rng_state(self.rng, rng_state)
+            print("Adım 1 atlandı: bootstrap edilmiş demo kümeleri checkpoint'ten yüklendi.")
+            return demo_candidates
+        demo_candidates = super()._bootstrap_fewshot_examples(program, trainset, seed, teacher)
+        self.checkpoint.save_demo_candidates(demo_candidates, _rng_state_to_json(self.rng))
+        return demo_candidates
+
+    def _propose_instructions(self, program, trainset, demo_candidates, *args, **kwargs):
+        if self.checkpoint is None:
+            return super()._propose_instructions(program, trainset, demo_candidates, *args, **kwargs)
+        saved = self.checkpoint.load_instruction_candidates()
+        if saved is not None:
+            instruction_candidates, rng_state = saved
+            _restore_rng_state(self.rng, rng_state)
+            print("Adım 2 atlandı: talimat adayları checkpoint'ten yüklendi.")
+            return instruction_candidates
+        instruction_candidates = super()._propose_instructions(program, trainset, demo_candidates, *args, **kwargs)
+        self.checkpoint.save_instruction_candidates(instruction_candidates, _rng_state_to_json(self.rng))
+        return instruction_candidates
+
+    def _optimize_prompt_parameters(self, program, instruction_candidates, demo_candidates, evaluate, valset, *args, **kwargs):
+        best_program_path = self.checkpoint.path(BEST_PROGRAM_FILE) if self.checkpoint is not None else None
+        self.checkpointed_evaluate = CheckpointedEvaluate(
+            evaluate, self.checkpoint, len(valset), best_program_path, self.process_pool, self.racing,
+        )
+        return super()._optimize_prompt_parameters(
+            program, instruction_candidates, demo_candidates, self.checkpointed_evaluate, valset, *args, **kwargs
+        )
+
+    def verify_racing(self):
+        """Elenen adayları tam değerlendirip seçilen programın skorunun tam değerlendirmeyle aynı olduğunu doğrular."""
+        e = self.checkpointed_evaluate
+        if self.racing is None or e is None or e.best_full_score is None:
+            return None
+        exhaustive_best, best_pruned = self.racing.verify(e.evaluate_examples, e.best_full_score)
+        print("Yarış doğrulaması (elenen adaylar tam valset üzerinde tamamlandı):")
+        print(f"  Seçilen programın skoru: {e.best_full_score}, tam değerlendirmeyle en iyi skor: {exhaustive_best}"
+              f" (elenenlerin en iyisi: {best_pruned if best_pruned is not None else '-'})")
+        print(f"  Sonuç: {'AYNI' if exhaustive_best == e.best_full_score else 'FARKLI'}")
+        return exhaustive_best == e.best_full_score
+
+    def report(self):
+        if self.checkpointed_evaluate is None:
+            return
+        e = self.checkpointed_evaluate
+        if self.checkpoint is not None:
+            print(f"Checkpoint raporu ('{self.checkpoint.directory}'):")
+            print(f"  Checkpoint'ten yeniden kullanılan değerlendirme: {e.reused}")
+            print(f"  Yeni yapılan değerlendirme: {e.evaluated}")
+            if e.best_full_score is not None:
+                best_dir = self.checkpoint.archive_dir or self.checkpoint.directory
+                print(f"  En iyi tam valset skoru: {e.best_full_score} ('{os.path.join(best_dir, BEST_PROGRAM_FILE)}')")
+        if self.racing is not None:
+            self.racing.report()
+
+
+# Süreç havuzu: her değerlendirmenin örnekleri worker süreçlere bölünür. Her worker LM'i bir kez (build_lm ile,
+# aynı CLI argümanlarıyla) kurar; aday program durumu (dump_state) her görevle birlikte gönderilir.
+
+_worker_metric = None
+
+
+def _init_worker(lm_args, metric):
+    global _worker_metric
+    from contextlib import redirect_stdout
+    import sys
+
+    from .lm import build_lm
+
+    with redirect_stdout(sys.stderr):
+        build_lm(lm_args)
+    _worker_metric = metric
+
+
+def _evaluate_shard(program_class, program_state, shard, stage):
+    import dspy
+
+    from .telemetry import set_stage
+
+    # Telemetri açıksa worker'daki çağrılar da ana süreçteki aşamayla kaydedilir
+    set_stage(stage["stage"], stage["trial"])
+    program = program_class()
+    program.load_state(program_state)
+    evaluate = dspy.Evaluate(devset=shard, metric=_worker_metric, display_progress=False, return_all_scores=True)
+    _, scores = evaluate(program)
+    return scores
+
+
+class ProcessPoolEvaluator:
+    """Bir aday programı valset parçaları üzerinde yerel süreç havuzunda değerlendirir."""
+
+    def __init__(self, lm_args, metric, processes):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.processes = processes
+        # fork yerine spawn: ana süreçteki thread'ler ve SQLite bağlantısı worker'lara kopyalanmasın
+        self._executor = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(lm_args, metric),
+        )
+
+    def __call__(self, program, devset):
+        from .telemetry import current_stage
+
+        state = program.dump_state()
+        stage = current_stage()
+        shards = [devset[i::self.processes] for i in range(self.processes)]
+        futures = [self._executor.submit(_evaluate_shard, type(program), state, shard, stage) for shard in shards if shard]
+        scores = [None] * len(devset)
+        for i, future in enumerate(futures):
+            scores[i::self.processes] = future.result()
+        score = round(100 * sum(scores) / len(devset), 2)
+        return score, scores
+
+    def close(self):
+        self._executor.shutdown()
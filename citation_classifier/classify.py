@@ -0,0 +1,82 @@
+from .config import CSV_TRAIN_PATH, save_path
+from .retrieval import add_retrieval_argument
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Yüklenecek optimize edilmiş program dosyası")
+    add_retrieval_argument(parser)
+    parser.add_argument("--citation", help="Tek bir atıf metnini sınıflandır (--section ile birlikte)")
+    parser.add_argument("--section", default="", help="Tek atıf için bölüm başlığı")
+    parser.add_argument("--input", help="Toplu sınıflandırılacak CSV dosyası (citation_context, section sütunları)")
+    parser.add_argument("--output", default="batch_predictions.jsonl", help="Sonuçların yazılacağı JSONL dosyası (ilerleme kaydı olarak da kullanılır)")
+    parser.add_argument("--workers", type=int, default=8, help="Eşzamanlı LM çağrısı sayısı (--rate-limited ile: azami eşzamanlılık)")
+    parser.add_argument("--rate-limited", action="store_true", help="RPM/TPM bütçeli, uyarlanabilir eşzamanlılıklı asyncio planlayıcısını kullan")
+    parser.add_argument("--rpm", type=int, help="Dakikalık istek bütçesi (varsayılan: modele göre)")
+    parser.add_argument("--tpm", type=int, help="Dakikalık token bütçesi (varsayılan: modele göre)")
+    parser.add_argument("--pack-size", type=int, help="Toplu modda her LM isteğinde bu kadar atıfı birlikte sınıflandır")
+    parser.add_argument("--cascade-threshold", type=float, help="Yerel ön sınıflandırıcı bu güvenin üzerindeyse LM'e gitmeden cevap ver")
+    parser.add_argument("--dedup-threshold", type=float, help="Bu benzerliğin üzerinde yakın kopyası sınıflandırılmış atıfların niyetini LM'e gitmeden yeniden kullan")
+    parser.add_argument("--dedup-no-trainset", action="store_true", help="Yakın kopya indeksini trainset.csv etiketleriyle başlatma")
+    return parser
+
+
+def run(args):
+    from .lm import build_lm
+    from .optimize import load_program
+
+    if not args.citation and not args.input:
+        print("HATA: --citation veya --input belirtilmelidir.")
+        return 2
+
+    # Planlayıcı kullanılırken yeniden denemeleri planlayıcı yönetir, litellm'in kendi denemeleri kapatılır
+    lm_kwargs = {"num_retries": 0} if args.rate_limited else {}
+    lm, response_cache = build_lm(args, **lm_kwargs)
+    if args.pack_size:
+        from .packing import copy_instructions
+        from .program import PackedClassifyCitation
+
+        program = PackedClassifyCitation(args.pack_size)
+        copy_instructions(args.program, program)
+    else:
+        program = load_program(args.program, retrieval_k=args.retrieval_k)
+    if args.cascade_threshold is not None:
+        from .cascade import CascadeClassifier, load_or_train_preclassifier
+
+        program = CascadeClassifier(load_or_train_preclassifier(), program, threshold=args.cascade_threshold)
+    cascade = program
+    if args.dedup_threshold is not None:
+        from .dedup import DedupClassifier, build_index
+
+        train_csv = None if args.dedup_no_trainset else CSV_TRAIN_PATH
+        program = DedupClassifier(build_index(args.dedup_threshold, train_csv=train_csv), program)
+
+    if args.citation:
+        result = program.forward(citation=args.citation, section=args.section)
+        print("Tahmin edilen intent:", getattr(result, "intent", "N/A"))
+        if getattr(result, "reasoning", None):
+            print("Gerekçe:", result.reasoning)
+    else:
+        from .batch import run_batch, run_batch_scheduled
+
+        print(f"Toplu sınıflandırma başlatılıyor: '{args.input}' -> '{args.output}'")
+        if args.rate_limited:
+            from .scheduler import RateLimitedScheduler
+
+            # Paketleme açıksa planlayıcı her paketi tek istek olarak bütçeler (forward_many(items=...))
+            scheduler = RateLimitedScheduler.for_model(
+                program.forward_many if args.pack_size else program.forward, args.model,
+                requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                max_concurrency=args.workers,
+            )
+            run_batch_scheduled(scheduler, args.input, args.output, pack_size=args.pack_size)
+        else:
+            run_batch(program, args.input, args.output, workers=args.workers, pack_size=args.pack_size)
+        if args.cascade_threshold is not None:
+            print(f"Kaskad: %{cascade.deferral_rate() * 100:.1f} atıf LM'e devredildi "
+                  f"({cascade.deferred_calls} LM, {cascade.local_calls} yerel).")
+        if args.dedup_threshold is not None:
+            program.report()
+
+    if response_cache is not None:
+        response_cache.report()
+    return 0
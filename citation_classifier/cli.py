@@ -0,0 +1,39 @@
+import argparse
+
+from . import analyze, benchmarks, cascade, classify, dedup, evaluate, http_server, optimize, packing, serve
+from .config import DEFAULT_MODEL
+from .lm import add_lm_arguments
+
+# Alt komutlar: her biri kendi modülünde add_arguments(parser) ve run(args) tanımlar.
+# Bu modüller en üst seviyede yalnızca standart kütüphaneyi içe aktarır; dspy/pandas yüklemeleri
+# run() içindedir, böylece `--help` ve worker başlangıcı ağır bağımlılıkları beklemez.
+COMMANDS = {
+    "optimize": (optimize, "MIPROv2 ile programı optimize et ve kaydet"),
+    "evaluate": (evaluate, "Kaydedilmiş programı devset üzerinde değerlendir"),
+    "classify": (classify, "Tek bir atıfı veya bir CSV dosyasını sınıflandır"),
+    "serve": (serve, "Programı bir kez yükleyip stdin'den gelen JSON satırlarını sınıflandır"),
+    "http": (http_server, "Programı bir kez yükleyip mikro-toplamalı HTTP sınıflandırma servisini başlat"),
+    "cascade": (cascade, "Yerel ön sınıflandırıcıyı eğit, eşik taraması yap ve kaskadı devset üzerinde raporla"),
+    "dedup": (dedup, "Yakın kopya atıflar için niyet yeniden kullanımını devset üzerinde tara ve raporla"),
+    "packing": (packing, "Paket boyutlarına göre atıf başına token ve doğruluğu ölç"),
+    "benchmark": (benchmarks, "Sahte LM ile performans ölçümlerini çalıştır"),
+    "analyze": (analyze, "Telemetri JSONL ve DSPy_Log_* metin loglarından maliyet, gecikme ve deneme skorlarını özetle"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="citation_classifier", description="DSPy atıf niyeti sınıflandırıcı")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (module, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        module.add_arguments(subparser)
+        if getattr(module, "USES_LM", True):
+            add_lm_arguments(subparser)
+        subparser.set_defaults(run=module.run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.model = getattr(args, "model", None) or DEFAULT_MODEL
+    return args.run(args)
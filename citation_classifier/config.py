@@ -0,0 +1,28 @@
+import os
+
+# Bu modül hiçbir ağır bağımlılık içe aktarmaz; CLI başlangıcı ve worker'lar için güvenle kullanılabilir.
+
+CSV_TRAIN_PATH = "data/trainset.csv"
+CSV_DEV_PATH = "data/devset.csv"
+CITATION_CLASSES = [ "background", "basis", "discuss", "support", "differ", "other"]
+MIN_TRAINSET_SIZE_FOR_MIPRO = 3
+save_path = "optimized_citation_classifier.json"  # Kaydettiğiniz dosyanın yolu
+CASCADE_MODEL_PATH = "cascade_model.joblib"  # Yerel ön sınıflandırıcı (kaskad) modeli
+CHECKPOINT_DIR = "optimization_checkpoint"  # MIPROv2 ilerlemesinin (demo, talimat, deneme skorları) kaydedildiği dizin
+
+# model = 'openai/gpt-4o-mini'
+# model = 'openai/gpt-4o'
+DEFAULT_MODEL = 'gemini/gemini-2.5-flash-preview-05-20'
+
+# API anahtarları ortam değişkenlerinden okunur
+API_KEY_ENV_VARS = {
+    "gemini/": "GOOGLE_API_KEY",
+    "openai/": "OPENAI_API_KEY",
+}
+
+
+def api_key_for(model):
+    for prefix, env_var in API_KEY_ENV_VARS.items():
+        if model.startswith(prefix):
+            return os.getenv(env_var)
+    return None
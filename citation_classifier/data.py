@@ -0,0 +1,361 @@
+import csv
+import itertools
+import json
+import os
+import shutil
+import uuid
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # Windows: kilit yok, yine de işaretçi değişimi okuyucular için atomiktir
+    fcntl = None
+
+# Sütunlu (columnar) veri kümesi önbelleği: CSV tek geçişte okunur ve her sütun, tüm değerlerin art arda eklendiği
+# UTF-8 bayt dizisi (<sütun>.bytes.npy) ile satır sınırlarını tutan ofset dizisi (<sütun>.offsets.npy) olarak
+# '<csv>.columnar/v-<kimlik>/' sürüm klasörüne kaydedilir. citation_intent ayrıca tamsayı sınıf kodlarına çevrilir ve satırlar sınıfa
+# göre gruplanmış bir indeks dizisi (class_order.npy) tutulur; örnekleme maske yerine bu dilimler üzerinden yapılır.
+# Önbellek, kaynak CSV'nin boyutu veya değiştirilme zamanı değişince yeniden oluşturulur. Dosyalar mmap ile açılır,
+# böylece milyonlarca satırlık derlemlerde yalnızca okunan örnekler belleğe gelir.
+# Geçerli sürüm, '<csv>.columnar/CURRENT' işaretçi dosyasıyla seçilir: yeni sürüm önce ayrı bir klasöre tamamen yazılır,
+# sonra işaretçi os.replace ile atomik olarak değiştirilir. Böylece eşzamanlı bir okuyucu hiçbir an önbelleği eksik
+# görmez; derlemeler '.lock' dosyası üzerinde kilitlenir ve kilidi alan süreç, başka bir sürecin az önce güncel bir
+# sürüm yazıp yazmadığını yeniden kontrol eder (iki derleyici birbirinin sonucunu silemez).
+
+CACHE_FORMAT_VERSION = 2
+CACHE_SUFFIX = ".columnar"
+CURRENT_POINTER = "CURRENT"
+LOCK_FILE = ".lock"
+BUILD_PREFIX = ".build-"
+# İşaretçi okunduktan sonra eski sürüm silinirse açma yeniden denenir
+OPEN_RETRIES = 3
+REQUIRED_COLUMNS = ("citation_intent", "citation_context", "section")
+BUILD_CHUNK_ROWS = 65536
+
+# Aynı süreçte aynı CSV'nin tekrar tekrar açılmaması için (ör. optimize trainset'i hem tam hem örneklenmiş yükler)
+_open_datasets = {}
+
+
+def columnar_cache_dir(csv_path):
+    return csv_path + CACHE_SUFFIX
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _current_version_dir(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CURRENT_POINTER), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    if not name or os.path.basename(name) != name:
+        return None
+    return os.path.join(cache_dir, name)
+
+
+def _is_stale(meta, signature):
+    return meta is None or meta.get("version") != CACHE_FORMAT_VERSION or meta.get("source") != signature
+
+
+class _CacheLock:
+    """Önbellek klasöründeki '.lock' dosyası üzerinde süreçler arası özel kilit (fcntl yoksa kilitsiz)."""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, LOCK_FILE)
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _raw_to_npy(raw_path, npy_path, dtype, count):
+    # Ham sütun dosyasının önüne .npy başlığı eklenir; veri belleğe alınmadan bloklar hâlinde kopyalanır
+    import numpy as np
+
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": (count,)}
+    with open(raw_path, "rb") as raw, open(npy_path, "wb") as out:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(raw, out, 1 << 20)
+    os.remove(raw_path)
+
+
+def build_columnar_cache(csv_path, cache_dir=None):
+    """CSV'yi tek geçişte okuyup sütunlu önbelleğin yeni bir sürümünü oluşturur ve geçerli sürüm yapar.
+    Sütunlar eksikse ValueError fırlatır. Geçerli sürüm klasörünün yolunu döndürür."""
+    cache_dir = cache_dir or columnar_cache_dir(csv_path)
+    with _CacheLock(cache_dir):
+        return _build_version(csv_path, cache_dir)
+
+
+def _build_version(csv_path, cache_dir):
+    # Önbellek kilidi tutulurken çağrılır
+    import numpy as np
+
+    signature = _source_signature(csv_path)
+    # Önce gizli bir derleme klasörüne yazılır; yarıda kalan bir yazım hiçbir zaman işaretçinin hedefi olmaz
+    tmp_dir = os.path.join(cache_dir, f"{BUILD_PREFIX}{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                raise ValueError(f"'{csv_path}' dosyası boş.")
+            missing = [column for column in REQUIRED_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"CSV dosyasında beklenen sütunlar bulunamadı: {missing}")
+
+            blob_files = [open(os.path.join(tmp_dir, f"{j}.bytes.raw"), "wb") for j in range(len(header))]
+            offset_files = [open(os.path.join(tmp_dir, f"{j}.offsets.raw"), "wb") for j in range(len(header))]
+            try:
+                ends = [0] * len(header)
+                for offset_file in offset_files:
+                    offset_file.write(array("q", [0]).tobytes())
+                label_column = header.index("citation_intent")
+                labels, label_codes = {}, array("i")
+                # Satırlar parçalar hâlinde okunup her parça hemen diske yazılır; metin sütunları için bellek
+                # kullanımı parça boyutuyla sınırlıdır (yalnızca satır başına 4 baytlık sınıf kodları bellekte tutulur)
+                while True:
+                    chunk = [row for row in itertools.islice(reader, BUILD_CHUNK_ROWS) if row]
+                    if not chunk:
+                        break
+                    chunk = [row if len(row) == len(header) else (row + [""] * len(header))[:len(header)] for row in chunk]
+                    for j, values in enumerate(zip(*chunk)):
+                        encoded = [value.encode("utf-8") for value in values]
+                        chunk_ends = itertools.accumulate(map(len, encoded), initial=ends[j])
+                        chunk_ends = array("q", itertools.islice(chunk_ends, 1, None))
+                        ends[j] = chunk_ends[-1]
+                        offset_files[j].write(chunk_ends.tobytes())
+                        blob_files[j].write(b"".join(encoded))
+                    label_codes.extend(labels.setdefault(row[label_column], len(labels)) for row in chunk)
+            finally:
+                for raw_file in blob_files + offset_files:
+                    raw_file.close()
+
+        rows = len(label_codes)
+        for j in range(len(header)):
+            column_path = os.path.join(tmp_dir, str(j))
+            _raw_to_npy(f"{column_path}.bytes.raw", f"{column_path}.bytes.npy", np.uint8, ends[j])
+            _raw_to_npy(f"{column_path}.offsets.raw", f"{column_path}.offsets.npy", np.int64, rows + 1)
+        codes = np.frombuffer(label_codes, dtype=np.int32)
+        np.save(os.path.join(tmp_dir, "labels.npy"), codes)
+        np.save(os.path.join(tmp_dir, "class_order.npy"), np.argsort(codes, kind="stable"))
+        class_starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(labels)))])
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": CACHE_FORMAT_VERSION,
+                "source": signature,
+                "columns": header,
+                "rows": rows,
+                "labels": list(labels),
+                "class_starts": class_starts.tolist(),
+            }, f, ensure_ascii=False)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    version = f"v-{uuid.uuid4().hex}"
+    version_dir = os.path.join(cache_dir, version)
+    os.rename(tmp_dir, version_dir)
+    pointer_tmp = os.path.join(cache_dir, f".{CURRENT_POINTER}.{os.getpid()}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(cache_dir, CURRENT_POINTER))
+
+    # Eski sürümler (ve önceki biçimin kök klasördeki dosyaları) silinir. Bunları mmap ile açmış süreçler okumaya
+    # devam eder; işaretçiyi eski sürümde okuyup henüz açmamış olanlar açmayı yeniden dener.
+    for name in os.listdir(cache_dir):
+        if name in (version, CURRENT_POINTER, LOCK_FILE):
+            continue
+        path = os.path.join(cache_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    print(f"'{csv_path}' için sütunlu önbellek oluşturuldu ({rows} satır): {version_dir}")
+    return version_dir
+
+
+def load_columnar_dataset(csv_path, rebuild=False):
+    """Güncel önbelleği açar; yoksa veya kaynak CSV değiştiyse önce yeniden oluşturur."""
+    cache_dir = columnar_cache_dir(csv_path)
+    signature = _source_signature(csv_path)
+    key = os.path.abspath(csv_path)
+    cached = _open_datasets.get(key)
+    if not rebuild and cached is not None and cached.meta["source"] == signature:
+        return cached
+
+    for attempt in range(OPEN_RETRIES):
+        version_dir = _current_version_dir(cache_dir)
+        meta = _read_meta(version_dir) if version_dir else None
+        if rebuild or _is_stale(meta, signature):
+            with _CacheLock(cache_dir):
+                # Kilit beklenirken başka bir süreç güncel sürümü yazmış olabilir; o durumda yeniden derlenmez
+                version_dir = _current_version_dir(cache_dir)
+                meta = _read_meta(version_dir) if version_dir else None
+                if rebuild or _is_stale(meta, signature):
+                    version_dir = _build_version(csv_path, cache_dir)
+            rebuild = False
+        try:
+            dataset = ColumnarDataset.open(version_dir)
+            break
+        except FileNotFoundError:
+            # Sürüm, işaretçi okunduktan sonra daha yeni bir derleme tarafından silindi
+            if attempt == OPEN_RETRIES - 1:
+                raise
+    _open_datasets[key] = dataset
+    return dataset
+
+
+class ColumnarDataset:
+    """Sütunlu önbellek üzerinde salt okunur görünüm: değerlere satır indeksiyle erişim, sınıf dilimleri ve örnekleme."""
+
+    def __init__(self, meta, columns, label_codes, class_order):
+        self.meta = meta
+        self.columns = columns
+        self.label_codes = label_codes
+        self.class_order = class_order
+        self.labels = meta["labels"]
+        self.class_starts = meta["class_starts"]
+        self._label_index = {label: code for code, label in enumerate(self.labels)}
+
+    @classmethod
+    def open(cls, cache_dir):
+        import numpy as np
+
+        with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {
+            name: (np.load(os.path.join(cache_dir, f"{j}.bytes.npy"), mmap_mode="r"),
+                   np.load(os.path.join(cache_dir, f"{j}.offsets.npy"), mmap_mode="r"))
+            for j, name in enumerate(meta["columns"])
+        }
+        label_codes = np.load(os.path.join(cache_dir, "labels.npy"), mmap_mode="r")
+        class_order = np.load(os.path.join(cache_dir, "class_order.npy"), mmap_mode="r")
+        return cls(meta, columns, label_codes, class_order)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def value(self, column, index):
+        blob, offsets = self.columns[column]
+        return blob[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def class_indices(self, label):
+        """Sınıfa ait satır indeksleri (class_order dizisinin bir dilimi, kopya yapılmaz)."""
+        code = self._label_index.get(label)
+        if code is None:
+            return self.class_order[:0]
+        return self.class_order[self.class_starts[code]:self.class_starts[code + 1]]
+
+    def class_counts(self):
+        return {label: self.class_starts[code + 1] - self.class_starts[code] for code, label in enumerate(self.labels)}
+
+    def sample_indices(self, quotas, random_state=42):
+        """{sınıf: örnek_sayısı} kotalarına göre her sınıfın indeks diliminden yerine koymadan örnekler.
+
+        Seçim, önceki pandas sürümündeki `df[df.citation_intent == sınıf].sample(n, random_state=...)` ile birebir
+        aynıdır: her sınıf için aynı tohumla yeni bir RandomState kurulur ve sınıfın satırları dosya sırasıyla
+        (class_order kararlı sıralamadır) örneklenir. Böylece aynı tohum aynı alt kümeleri verir."""
+        import numpy as np
+
+        selected = []
+        for label, quota in quotas.items():
+            indices = self.class_indices(label)
+            quota = min(quota, len(indices))
+            if quota > 0:
+                rng = np.random.RandomState(random_state)
+                selected.append(np.asarray(indices)[rng.choice(len(indices), size=quota, replace=False)])
+        return np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+
+    def balanced_indices(self, citation_classes, samples_per_class, random_state=42):
+        return self.sample_indices({label: samples_per_class for label in citation_classes}, random_state)
+
+    def stratified_indices(self, citation_classes, total, random_state=42):
+        """Sınıf oranlarını koruyarak toplam `total` örnek; kesirler en büyük kalan yöntemiyle dağıtılır."""
+        counts = {label: self.class_counts().get(label, 0) for label in citation_classes}
+        population = sum(counts.values())
+        if population == 0:
+            return self.sample_indices({}, random_state)
+        total = min(total, population)
+        exact = {label: total * count / population for label, count in counts.items()}
+        quotas = {label: int(share) for label, share in exact.items()}
+        remainder = total - sum(quotas.values())
+        for label in sorted(exact, key=lambda label: quotas[label] - exact[label])[:remainder]:
+            quotas[label] += 1
+        return self.sample_indices(quotas, random_state)
+
+    def iter_examples(self, indices=None):
+        """dspy.Example nesnelerini tek tek üretir; liste yalnızca çağıran isterse oluşturulur."""
+        import dspy
+
+        for i in range(len(self)) if indices is None else indices:
+            i = int(i)
+            yield dspy.Example(
+                citation=self.value("citation_context", i),
+                section=self.value("section", i),
+                citation_intent=self.value("citation_intent", i),
+            ).with_inputs("citation", "section")  # Modelin Signature'daki InputField'ları ile eşleşmeli
+
+
+def iter_trainset(csv_path, citation_classes, get_all_samples=False, samples_per_class=2, random_state_val=42,
+                  stratified_total=None):
+    """load_and_prepare_trainset'in akış (generator) hâli; Example nesneleri tüketildikçe oluşturulur."""
+    try:
+        dataset = load_columnar_dataset(csv_path)
+    except FileNotFoundError:
+        print(f"HATA: '{csv_path}' dosyası bulunamadı. Lütfen dosya yolunu kontrol edin.")
+        return
+    except Exception as e:
+        print(f"CSV dosyası ('{csv_path}') okunurken bir hata oluştu: {e}")
+        return
+
+    if len(dataset) == 0:
+        print(f"Uyarı: '{csv_path}' dosyası boş veya okunamadı.")
+        return
+
+    indices = None
+    if stratified_total is not None:
+        indices = dataset.stratified_indices(citation_classes, stratified_total, random_state_val)
+    elif not get_all_samples:
+        indices = dataset.balanced_indices(citation_classes, samples_per_class, random_state_val)
+    if indices is not None and len(indices) == 0:
+        print("Uyarı: Trainset için dengeli alt küme oluşturulamadı (sınıflar bulunamadı veya boş).")
+        return
+
+    yield from dataset.iter_examples(indices)
+
+
+def load_and_prepare_trainset(csv_path, citation_classes, get_all_samples=False, samples_per_class=2, random_state_val=42,
+                              stratified_total=None):
+    trainset_examples = list(iter_trainset(csv_path, citation_classes, get_all_samples, samples_per_class,
+                                           random_state_val, stratified_total))
+    if not trainset_examples:
+        print("Uyarı: DSPy Example nesnelerinden oluşan trainset boş.")
+    return trainset_examples
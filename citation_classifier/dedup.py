@@ -0,0 +1,408 @@
+import itertools
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+from .cascade import normalize_section
+from .config import CSV_DEV_PATH, CSV_TRAIN_PATH, save_path
+
+# Yakın kopya atıf tespiti: tezlerde aynı cümle bölümler arasında, taslak düzeltmelerinde veya kalıp ifadeler hâlinde
+# tekrar eder. citation_context metni normalize edilip (atıf işaretleri, sayılar ve noktalama atılır) kelime
+# 3-gramlarının MinHash imzası çıkarılır; imza bantlara bölünerek (LSH) aynı bölüm (section) içindeki adaylar bulunur.
+# Tahmini Jaccard benzerliği eşiğin üzerindeki bir önceki atıfın niyeti (trainset etiketi veya daha önce LM'in
+# verdiği cevap) LM çağrısı yapılmadan yeniden kullanılır. İndeks sabit kapasiteli bir halka tampondur; dolunca en
+# eski kayıtlar çıkarılır, yakın kopyası zaten bulunan atıflar eklenmez, böylece bellek satır sayısından bağımsızdır.
+# Eşzamanlı çalışmada LM'e gönderilen atıfın imzası cevap gelmeden "beklemede" olarak kaydedilir (ortak bir Future
+# ile); o sırada gelen yakın kopyalar LM'i tekrar çağırmak yerine bu cevabı bekler.
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 8
+DEFAULT_CAPACITY = 100_000
+SHINGLE_SIZE = 3
+SWEEP_THRESHOLDS = [0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+# Evrensel hash ailesi (a*x + b) mod p için 2^32'den büyük en küçük asal; 32 bitlik x ile çarpım uint64'e sığar
+_MERSENNE_LIKE_PRIME = 4294967311
+
+_CITATION_MARKERS = re.compile(r"\[[\d\s,;–-]*\]|\([^()]*\d{4}[a-z]?[^()]*\)")
+_NON_WORD = re.compile(r"[\W\d_]+")
+
+
+def normalize_citation(text):
+    text = str(text).replace("İ", "i").replace("I", "ı").lower()
+    text = _CITATION_MARKERS.sub(" ", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = normalize_citation(text).split()
+    # Çok kısa metinler (ör. yalnızca "... [43]") niyet hakkında bilgi taşımaz, tekrar kullanıma aday olmaz
+    if len(words) < size:
+        return set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        import numpy as np
+
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        permuted = (hashes[:, None] * self.a + self.b) % np.uint64(_MERSENNE_LIKE_PRIME)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Bölüm kapsamlı MinHash/LSH indeksi; sabit kapasiteli halka tamponda imza, niyet ve kaynak tutar."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 capacity=DEFAULT_CAPACITY, seed=1):
+        import numpy as np
+
+        if num_perm % bands:
+            raise ValueError("num_perm, bant sayısına tam bölünmelidir.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.capacity = capacity
+        self.hasher = MinHasher(num_perm, seed)
+        self.signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        self.sections = [None] * capacity
+        self.intents = [None] * capacity
+        self.origins = [None] * capacity
+        self.buckets = {}
+        self.size = 0
+        self.inserted = 0
+        self.evicted = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        # LM cevabı beklenen imzalar: token -> (imza, bölüm, Future); bant anahtarı -> token kümesi
+        self._pending = {}
+        self._pending_buckets = {}
+        self._tokens = itertools.count()
+
+    def signature(self, citation):
+        return self.hasher.signature(citation)
+
+    def _band_keys(self, signature, section):
+        step = self.rows_per_band
+        return [hash((section, band, signature[band * step:(band + 1) * step].tobytes())) for band in range(self.bands)]
+
+    def _lookup(self, signature, section):
+        candidates = {self.buckets[key] for key in self._band_keys(signature, section) if key in self.buckets}
+        best, best_similarity = None, 0.0
+        for slot in candidates:
+            similarity = float((self.signatures[slot] == signature).mean())
+            if similarity > best_similarity:
+                best, best_similarity = slot, similarity
+        if best is None or best_similarity < self.threshold:
+            return None
+        return {"intent": self.intents[best], "similarity": best_similarity, "origin": self.origins[best]}
+
+    def _lookup_pending(self, signature, section):
+        candidates = set()
+        for key in self._band_keys(signature, section):
+            candidates.update(self._pending_buckets.get(key, ()))
+        best, best_similarity = None, 0.0
+        for token in candidates:
+            pending_signature, _, future = self._pending[token]
+            similarity = float((pending_signature == signature).mean())
+            if similarity > best_similarity:
+                best, best_similarity = future, similarity
+        if best is None or best_similarity < self.threshold:
+            return None
+        return {"future": best, "similarity": best_similarity}
+
+    def _drop_pending(self, token):
+        signature, section, future = self._pending.pop(token)
+        for key in self._band_keys(signature, section):
+            tokens = self._pending_buckets.get(key)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._pending_buckets[key]
+        return signature, section, future
+
+    def claim(self, signature, section):
+        """Atıf için ne yapılacağını tek kilit altında belirler:
+        ("match", kayıt) yakın kopya indekste; ("pending", {"future", "similarity"}) yakın kopyası şu an LM'de,
+        cevabı Future'dan beklenir; ("owner", token) LM'e bu atıf gönderilmeli, sonra resolve(token, ...) çağrılmalı.
+        """
+        if signature is None:
+            return "owner", None
+        section = normalize_section(section)
+        with self._lock:
+            match = self._lookup(signature, section)
+            if match is not None:
+                return "match", match
+            pending = self._lookup_pending(signature, section)
+            if pending is not None:
+                return "pending", pending
+            token = next(self._tokens)
+            self._pending[token] = (signature, section, Future())
+            for key in self._band_keys(signature, section):
+                self._pending_buckets.setdefault(key, set()).add(token)
+            return "owner", token
+
+    def resolve(self, token, intent, origin="llm"):
+        """Bekleyen imzayı indekse ekler ve bekleyenlere niyeti iletir; intent boşsa (LM hatası) bekleyenler None alır
+        ve atıflarını kendileri sınıflandırır."""
+        if token is None:
+            return
+        with self._lock:
+            signature, section, future = self._drop_pending(token)
+            if intent:
+                self._add(signature, section, intent, origin)
+        future.set_result(intent or None)
+
+    def lookup(self, signature, section):
+        """Eşik üzerindeki en benzer kaydı {"intent", "similarity", "origin"} olarak döndürür, yoksa None."""
+        if signature is None:
+            return None
+        with self._lock:
+            return self._lookup(signature, normalize_section(section))
+
+    def add(self, signature, section, intent, origin="llm"):
+        if signature is None or not intent:
+            return False
+        with self._lock:
+            return self._add(signature, normalize_section(section), intent, origin)
+
+    def _add(self, signature, section, intent, origin):
+        if self._lookup(signature, section) is not None:
+            return False
+        slot = self._next % self.capacity
+        if self._next >= self.capacity:
+            for key in self._band_keys(self.signatures[slot], self.sections[slot]):
+                if self.buckets.get(key) == slot:
+                    del self.buckets[key]
+            self.evicted += 1
+        self.signatures[slot] = signature
+        self.sections[slot], self.intents[slot], self.origins[slot] = section, intent, origin
+        for key in self._band_keys(signature, section):
+            self.buckets[key] = slot
+        self._next += 1
+        self.inserted += 1
+        self.size = min(self._next, self.capacity)
+        return True
+
+    def add_labeled_csv(self, csv_path):
+        """Etiketli bir CSV'deki atıfları (ör. trainset.csv) sütunlu önbellek üzerinden satır satır ekler."""
+        from .data import load_columnar_dataset
+
+        dataset = load_columnar_dataset(csv_path)
+        for i in range(len(dataset)):
+            citation = dataset.value("citation_context", i)
+            intent = dataset.value("citation_intent", i).strip().lower()
+            self.add(self.signature(citation), dataset.value("section", i), intent, origin="train")
+        return self
+
+
+class DedupClassifier:
+    """Yakın kopyası daha önce sınıflandırılmış (veya trainset'te etiketli) atıflar için LM'i çağırmadan niyeti yeniden kullanır."""
+
+    def __init__(self, index, program):
+        self.index = index
+        self.program = program
+        self.reused = {"train": 0, "llm": 0}
+        self.forwarded = 0
+        self.waited = 0
+        self._lock = threading.Lock()
+
+    def _reuse(self, match, waited=False):
+        import dspy
+
+        with self._lock:
+            self.reused[match["origin"]] = self.reused.get(match["origin"], 0) + 1
+            self.waited += waited
+        return dspy.Prediction(intent=match["intent"], route="dedup", similarity=match["similarity"],
+                               reasoning=f"Yakın kopya atıftan yeniden kullanıldı (benzerlik {match['similarity']:.2f}, "
+                                         f"kaynak {match['origin']})")
+
+    def _intent(self, prediction):
+        return str(getattr(prediction, "intent", "") or "").strip().lower()
+
+    def forward(self, citation, section):
+        state, value = self.index.claim(self.index.signature(citation), section)
+        if state == "match":
+            return self._reuse(value)
+        if state == "pending":
+            # Yakın kopyası şu an LM'de: cevabı beklenir; o çağrı başarısız olduysa atıf kendisi sınıflandırılır
+            intent = value["future"].result()
+            if intent:
+                return self._reuse({"intent": intent, "similarity": value["similarity"], "origin": "llm"}, waited=True)
+        with self._lock:
+            self.forwarded += 1
+        token = value if state == "owner" else None
+        try:
+            prediction = self.program.forward(citation=citation, section=section)
+        except BaseException:
+            self.index.resolve(token, None)
+            raise
+        self.index.resolve(token, self._intent(prediction))
+        return prediction
+
+    __call__ = forward
+
+    def forward_many(self, items):
+        # Paketlenmiş programlarla kullanım: yalnızca yakın kopyası bulunmayanlar LM'e gönderilir. Aynı paketteki veya
+        # başka iş parçacığında LM'de olan yakın kopyalar, kendi paketimiz sonuçlandıktan sonra beklenir (kilitlenme olmaz)
+        predictions, deferred, tokens, waiting = [None] * len(items), [], {}, []
+        for i, (citation, section) in enumerate(items):
+            state, value = self.index.claim(self.index.signature(citation), section)
+            if state == "match":
+                predictions[i] = self._reuse(value)
+            elif state == "pending":
+                waiting.append((i, value))
+            else:
+                deferred.append(i)
+                tokens[i] = value
+        self._forward_deferred(items, deferred, predictions, tokens)
+
+        fallback = []
+        for i, pending in waiting:
+            intent = pending["future"].result()
+            if intent:
+                predictions[i] = self._reuse({"intent": intent, "similarity": pending["similarity"], "origin": "llm"},
+                                             waited=True)
+            else:
+                fallback.append(i)
+        self._forward_deferred(items, fallback, predictions, {})
+        return predictions
+
+    def _forward_deferred(self, items, deferred, predictions, tokens):
+        if not deferred:
+            return
+        with self._lock:
+            self.forwarded += len(deferred)
+        try:
+            results = self.program.forward_many([items[i] for i in deferred])
+        except BaseException:
+            for token in tokens.values():
+                self.index.resolve(token, None)
+            raise
+        for i, prediction in zip(deferred, results):
+            predictions[i] = prediction
+            self.index.resolve(tokens.get(i), self._intent(prediction) if prediction.intent is not None else None)
+
+    def dedup_ratio(self):
+        reused = sum(self.reused.values())
+        total = reused + self.forwarded
+        return reused / total if total else 0.0
+
+    def report(self):
+        reused = sum(self.reused.values())
+        print(f"Yakın kopya: %{self.dedup_ratio() * 100:.1f} atıf yeniden kullanıldı ({reused} atıf; trainset "
+              f"{self.reused.get('train', 0)}, önceki tahmin {self.reused.get('llm', 0)}, bunların {self.waited} tanesi "
+              f"LM'deki yakın kopyası beklenerek), {self.forwarded} atıf "
+              f"programa gönderildi; indeks {self.index.size} kayıt, {self.index.evicted} çıkarılan.")
+
+
+def build_index(threshold=DEFAULT_THRESHOLD, capacity=DEFAULT_CAPACITY, train_csv=CSV_TRAIN_PATH):
+    index = NearDuplicateIndex(threshold=threshold, capacity=capacity)
+    if train_csv:
+        index.add_labeled_csv(train_csv)
+    return index
+
+
+def iter_labeled_rows(csv_path):
+    from .data import load_columnar_dataset
+
+    dataset = load_columnar_dataset(csv_path)
+    for i in range(len(dataset)):
+        yield (dataset.value("citation_context", i), dataset.value("section", i),
+               dataset.value("citation_intent", i).strip().lower())
+
+
+def sweep_thresholds(devset, train_csv, capacity, thresholds=SWEEP_THRESHOLDS):
+    """LM çağrısı yapmadan: eşik başına yeniden kullanım oranı ve yeniden kullanılan niyetin gerçek etiketle uyumu.
+    Daha önce görülen devset satırları bu taramada LM cevabı yerine kendi gerçek etiketleriyle indekse eklenir."""
+    results = []
+    for threshold in thresholds:
+        index = build_index(threshold, capacity, train_csv)
+        rows, reused, agree = 0, 0, 0
+        for citation, section, gold in iter_labeled_rows(devset):
+            rows += 1
+            signature = index.signature(citation)
+            match = index.lookup(signature, section)
+            if match is not None:
+                reused += 1
+                agree += match["intent"] == gold
+            else:
+                index.add(signature, section, gold, origin="llm")
+        results.append({
+            "threshold": threshold,
+            "dedup_ratio": reused / rows if rows else 0.0,
+            "reused": reused,
+            "label_agreement": agree / reused if reused else 0.0,
+        })
+    return results
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Yakın kopyası bulunmayan atıflar için kullanılacak program dosyası")
+    parser.add_argument("--devset", default=CSV_DEV_PATH, help="Raporlama için kullanılacak CSV dosyası")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Niyetin yeniden kullanılması için gereken asgari tahmini Jaccard benzerliği")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="İndekste tutulacak en fazla kayıt (bellek sınırı)")
+    parser.add_argument("--no-trainset", action="store_true", help="İndeksi trainset.csv etiketleriyle başlatma")
+    parser.add_argument("--sweep-only", action="store_true", help="Yalnızca eşik taramasını yap, LM çağrısı yapma")
+    return parser
+
+
+def run(args):
+    train_csv = None if args.no_trainset else CSV_TRAIN_PATH
+    print(f"Eşik taraması ('{args.devset}', LM çağrısı yok):")
+    print("  eşik   yeniden_kullanım   atıf   etiket_uyumu")
+    for r in sweep_thresholds(args.devset, train_csv, args.capacity):
+        print(f"  {r['threshold']:<6} %{r['dedup_ratio'] * 100:<16.1f} {r['reused']:<6} %{r['label_agreement'] * 100:.1f}")
+    if args.sweep_only:
+        return 0
+
+    from .lm import build_lm
+    from .optimize import load_program
+
+    _, response_cache = build_lm(args)
+    program = load_program(args.program)
+    index = build_index(args.threshold, args.capacity, train_csv)
+    # Her satır için LM cevabı da alınır (temel doğruluk); yakın kopya yolu aynı sırayla ilerleyen bir
+    # DedupClassifier'ın vereceği cevabı verir, böylece doğruluk farkı aynı LM cevapları üzerinden ölçülür.
+    rows, reused, baseline_correct, dedup_correct = 0, 0, 0, 0
+    started = time.perf_counter()
+    for citation, section, gold in iter_labeled_rows(args.devset):
+        rows += 1
+        llm_intent = str(getattr(program.forward(citation=citation, section=section), "intent", "")).strip().lower()
+        signature = index.signature(citation)
+        match = index.lookup(signature, section)
+        if match is not None:
+            reused += 1
+            intent = match["intent"]
+        else:
+            intent = llm_intent
+            index.add(signature, section, llm_intent)
+        baseline_correct += llm_intent == gold
+        dedup_correct += intent == gold
+    elapsed = time.perf_counter() - started
+
+    print(f"Yakın kopya raporu (eşik {args.threshold}, {rows} örnek, {elapsed:.1f} sn):")
+    print(f"  Yeniden kullanım (dedup) oranı: %{reused / rows * 100 if rows else 0:.1f} "
+          f"({reused} atıf için LM çağrısı gerekmez)")
+    baseline = baseline_correct / rows * 100 if rows else 0.0
+    deduped = dedup_correct / rows * 100 if rows else 0.0
+    print(f"  Doğruluk: yalnızca LM %{baseline:.1f}, yakın kopya ile %{deduped:.1f} (fark {deduped - baseline:+.1f} puan)")
+    print(f"  İndeks: {index.size} kayıt, {index.evicted} çıkarılan")
+    if response_cache is not None:
+        response_cache.report()
+    return 0
@@ -0,0 +1,87 @@
+from .config import CITATION_CLASSES, CSV_DEV_PATH, save_path
+from .retrieval import add_retrieval_argument
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Değerlendirilecek program dosyası")
+    add_retrieval_argument(parser)
+    parser.add_argument("--devset", default=CSV_DEV_PATH, help="Değerlendirme CSV dosyası")
+    parser.add_argument("--threads", type=int, default=8, help="Eşzamanlı değerlendirme iş parçacığı sayısı")
+    parser.add_argument("--compare-retrieval", action="store_true",
+                        help="Sabit demolu programı --retrieval-k ile seçilen demolara karşı değerlendir "
+                             "(çağrı başına prompt token'ı ve sınıf bazında doğruluk)")
+    return parser
+
+
+def evaluate_detailed(program, devset, lm, threads):
+    """Genel ve sınıf bazında doğruluk ile LM çağrısı başına ortalama prompt token'ı."""
+    import dspy
+
+    from .metrics import exact_match_metric
+    from .packing import lm_usage_since
+
+    history_start = len(lm.history)
+    evaluator = dspy.Evaluate(devset=devset, metric=exact_match_metric, num_threads=threads,
+                              display_progress=True, display_table=False)
+    score, outputs = evaluator(program, return_outputs=True)
+    calls = len(lm.history) - history_start
+    prompt_tokens, _ = lm_usage_since(lm, history_start)
+
+    per_class = {label: [0, 0] for label in CITATION_CLASSES}
+    for example, _, example_score in outputs:
+        counts = per_class.setdefault(example.citation_intent, [0, 0])
+        counts[0] += bool(example_score)
+        counts[1] += 1
+    return {
+        "accuracy": float(score),
+        "calls": calls,
+        "prompt_tokens_per_call": round(prompt_tokens / calls, 1) if calls else 0.0,
+        "per_class": {label: (correct / total if total else None, total) for label, (correct, total) in per_class.items()},
+    }
+
+
+def print_report(results):
+    """{ad: evaluate_detailed sonucu} sözlüğünü sütunlar hâlinde yazdırır."""
+    names = list(results)
+    print(f"{'':<22}" + "".join(f"{name:>18}" for name in names))
+    print(f"{'doğruluk':<22}" + "".join(f"{'%' + format(results[n]['accuracy'], '.2f'):>18}" for n in names))
+    print(f"{'LM çağrısı':<22}" + "".join(f"{results[n]['calls']:>18}" for n in names))
+    print(f"{'prompt token/çağrı':<22}" + "".join(f"{results[n]['prompt_tokens_per_call']:>18}" for n in names))
+    for label in CITATION_CLASSES:
+        cells = []
+        for name in names:
+            accuracy, total = results[name]["per_class"].get(label, (None, 0))
+            cells.append("-" if accuracy is None else f"%{accuracy * 100:.1f} ({total})")
+        print(f"{label:<22}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+def run(args):
+    from .data import load_and_prepare_trainset
+    from .lm import build_lm
+    from .optimize import load_program
+    from .telemetry import set_stage
+
+    lm, response_cache = build_lm(args)
+    set_stage("eval")
+    devset = load_and_prepare_trainset(csv_path=args.devset, citation_classes=CITATION_CLASSES, get_all_samples=True)
+    if not devset:
+        print("HATA: Değerlendirme seti boş, değerlendirme yapılamadı.")
+        return 1
+
+    programs = {}
+    if args.compare_retrieval:
+        programs["sabit demolar"] = load_program(args.program)
+        # Karşılaştırmada k verilmemişse derlenmiş demo sayısı kullanılır
+        program = load_program(args.program, retrieval_k=args.retrieval_k or 0)
+        programs[f"retrieval k={program.num_demos}"] = program
+    else:
+        programs["program"] = load_program(args.program, retrieval_k=args.retrieval_k)
+
+    results = {name: evaluate_detailed(program, devset, lm, args.threads) for name, program in programs.items()}
+    for name, result in results.items():
+        print(f"Değerlendirme tamamlandı ({name}): {len(devset)} örnek, doğruluk %{result['accuracy']:.2f}")
+    print_report(results)
+
+    if response_cache is not None:
+        response_cache.report()
+    return 0
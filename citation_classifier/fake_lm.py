@@ -0,0 +1,212 @@
+import collections
+import csv
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+import dspy
+from litellm import ModelResponse
+
+from .config import CITATION_CLASSES
+
+# API'ye gitmeden performans ölçümü ve test için deterministik, yerel LM.
+# dspy.LM(model, ...) yerine kullanılır; ChatAdapter formatında yanıt üretir.
+#   * intent alanı: oracle (CSV'deki doğru etiketler) + ayarlanabilir doğruluk oranı
+#   * diğer çıktı alanları (reasoning, proposed_instruction, ...): deterministik dolgu metni
+#   * prompt_sensitivity > 0 ise doğruluk, talimat ve demolara (son mesaj hariç tüm mesajlar) göre deterministik olarak
+#     ±prompt_sensitivity kadar değişir; böylece optimizasyon adayları birbirinden farklı skorlar alır
+#   * gecikme, hata oranı ve dakikalık istek sınırı (429) ayarlanabilir
+
+FIELD_PATTERN = re.compile(r"\[\[ ## (\w+) ## \]\]")
+
+
+class FakeLMError(Exception):
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeRateLimitError(FakeLMError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
+
+def load_oracle(*csv_paths):
+    oracle = {}
+    for path in csv_paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                oracle[row["citation_context"].strip()] = row["citation_intent"].strip()
+    return oracle
+
+
+def _stable_unit(text, salt=""):
+    digest = hashlib.md5((salt + text).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class _SharedState:
+    """lm.copy() ile oluşan kopyaların ortak kullandığı sayaçlar, rastgele sayı üreteci ve hız sınırı penceresi."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.window = collections.deque()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.call_latencies = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class FakeLM(dspy.LM):
+    def __init__(self, oracle=None, accuracy=0.85, latency_s=0.0, latency_jitter_s=0.0, error_rate=0.0,
+                 requests_per_minute=None, seed=0, prompt_sensitivity=0.0, model="fake/citation-oracle",
+                 rate_window_s=60.0, **kwargs):
+        kwargs.setdefault("cache", False)
+        super().__init__(model, **kwargs)
+        self.oracle = oracle or {}
+        self.accuracy = accuracy
+        self.latency_s = latency_s
+        self.latency_jitter_s = latency_jitter_s
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        # requests_per_minute sınırının uygulandığı pencere; testlerde kısaltılarak 429 sonrası bekleme kısaltılır
+        self.rate_window_s = rate_window_s
+        self.seed = seed
+        self.prompt_sensitivity = prompt_sensitivity
+        # MIPROv2 / lm.copy derin kopya alır: kwargs ve history kopyaya ait olur, sayaçlar ortak kalır
+        self._state = _SharedState(seed)
+
+    @property
+    def calls(self):
+        return self._state.calls
+
+    @property
+    def call_latencies(self):
+        return self._state.call_latencies
+
+    @property
+    def prompt_tokens(self):
+        return self._state.prompt_tokens
+
+    @property
+    def completion_tokens(self):
+        return self._state.completion_tokens
+
+    def config(self):
+        return {
+            "model": self.model, "accuracy": self.accuracy, "latency_s": self.latency_s,
+            "latency_jitter_s": self.latency_jitter_s, "error_rate": self.error_rate,
+            "requests_per_minute": self.requests_per_minute, "seed": self.seed,
+            "prompt_sensitivity": self.prompt_sensitivity,
+        }
+
+    def reset_stats(self):
+        with self._state.lock:
+            self._state.reset()
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt}]
+        start = time.perf_counter()
+        state = self._state
+        with state.lock:
+            self._check_rate_limit()
+            delay = max(0.0, self.latency_s + state.rng.uniform(-self.latency_jitter_s, self.latency_jitter_s))
+            failed = state.rng.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise FakeLMError("Fake LM: simulated server error", status_code=503)
+
+        content = self.render_completion(messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        with state.lock:
+            state.calls += 1
+            state.prompt_tokens += prompt_tokens
+            state.completion_tokens += completion_tokens
+            state.call_latencies.append(time.perf_counter() - start)
+        return ModelResponse(
+            model=self.model,
+            choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                   "total_tokens": prompt_tokens + completion_tokens},
+        )
+
+    def _check_rate_limit(self):
+        if not self.requests_per_minute:
+            return
+        window = self._state.window
+        now = time.monotonic()
+        while window and now - window[0] >= self.rate_window_s:
+            window.popleft()
+        if len(window) >= self.requests_per_minute:
+            raise FakeRateLimitError("Fake LM: 429 rate limit exceeded", retry_after=self.rate_window_s - (now - window[0]))
+        window.append(now)
+
+    def render_completion(self, messages):
+        query = str(messages[-1].get("content", ""))
+        fields = self._output_fields(messages)
+        inputs = self._input_values(query)
+        accuracy = self.prompt_accuracy(messages)
+        parts = []
+        for field in fields:
+            if field == "intent":
+                value = self.predict_intent(inputs.get("citation", ""), inputs.get("section", ""), accuracy)
+            elif field == "intents":
+                # Paketlenmiş imza: citations alanındaki JSON dizisindeki her atıf için {id, intent}
+                items = json.loads(inputs.get("citations", "[]"))
+                value = json.dumps([
+                    {"id": item["id"], "intent": self.predict_intent(item["citation"], item.get("section", ""), accuracy)}
+                    for item in items
+                ], ensure_ascii=False)
+            else:
+                value = f"Deterministic {field} text for offline benchmarking."
+            parts.append(f"[[ ## {field} ## ]]\n{value}")
+        parts.append("[[ ## completed ## ]]")
+        return "\n\n".join(parts)
+
+    def _output_fields(self, messages):
+        # ChatAdapter son mesajı "Respond with the corresponding output fields, starting with the field ..." ile bitirir
+        query = str(messages[-1].get("content", ""))
+        marker = query.rfind("Respond with the corresponding output fields")
+        if marker != -1:
+            fields = [f for f in FIELD_PATTERN.findall(query[marker:]) if f != "completed"]
+            if fields:
+                return fields
+        system = str(messages[0].get("content", ""))
+        section = system.split("Your output fields are:", 1)[-1].split("All interactions", 1)[0]
+        return re.findall(r"^\d+\. `(\w+)`", section, flags=re.MULTILINE) or ["intent"]
+
+    @staticmethod
+    def _input_values(query):
+        values = {}
+        pieces = FIELD_PATTERN.split(query)
+        # split çıktısı: [önce, alan1, değer1, alan2, değer2, ...]
+        for name, value in zip(pieces[1::2], pieces[2::2]):
+            values[name] = value.split("Respond with the corresponding output fields", 1)[0].strip()
+        return values
+
+    def prompt_accuracy(self, messages):
+        if not self.prompt_sensitivity:
+            return self.accuracy
+        prompt = "\n".join(str(m.get("content", "")) for m in messages[:-1])
+        shift = self.prompt_sensitivity * (2 * _stable_unit(prompt, str(self.seed)) - 1)
+        return min(1.0, max(0.0, self.accuracy + shift))
+
+    def predict_intent(self, citation, section, accuracy=None):
+        accuracy = self.accuracy if accuracy is None else accuracy
+        gold = self.oracle.get(citation.strip())
+        if gold is not None and _stable_unit(citation, str(self.seed)) < accuracy:
+            return gold
+        candidates = [c for c in CITATION_CLASSES if c != gold]
+        return candidates[int(_stable_unit(citation, f"wrong-{self.seed}") * len(candidates))]
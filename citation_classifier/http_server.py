@@ -0,0 +1,553 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .analyze import LatencyHistogram
+from .config import CSV_DEV_PATH, save_path
+from .retrieval import add_retrieval_argument
+from .scheduler import RateLimitedScheduler
+
+# HTTP sınıflandırma servisi: program başlangıçta bir kez yüklenir, istekler bir mikro-toplama (micro-batching)
+# kuyruğuna alınır. Kısa bir pencere (--batch-window-ms) içinde gelen atıflar, en fazla --max-batch olacak şekilde
+# tek bir toplu gönderimde birleştirilir. --pack-size verilirse toplu gönderim PackedClassifyCitation ile --pack-size
+# atıflık paketlere bölünür ve her paket tek LM isteğidir. Verilmezse toplama yalnızca kuyruklamayı birleştirir: her
+# atıf yine ayrı bir ClassifyCitation LM isteğidir, tasarruf yalnızca aynı toplu gönderimdeki özdeş atıfların bir kez
+# sınıflandırılmasından gelir. Tüm LM istekleri (paket veya tek atıf) RateLimitedScheduler üzerinden gönderilir:
+# RPM/TPM bütçesi (--rpm/--tpm), uyarlanabilir eşzamanlılık ve 429 / geçici hatalarda geri çekilmeli yeniden deneme
+# batch modundakiyle aynıdır. Bekleyen atıf sayısı --max-queue ile sınırlıdır; kuyruk doluysa istek 429 ile reddedilir
+# (geri basınç).
+#
+#   POST /classify        {"id", "citation", "section"}  -> {"id", "intent", "status", "latency_s"}
+#   POST /classify        [{...}, ...] veya {"items": [...]} -> {"results": [...]}
+#   POST /classify/bulk   toplu istek için açık uç nokta
+#   GET  /metrics         istek/atıf sayıları, throughput, gecikme yüzdelikleri, kuyruk, toplu gönderim ve planlayıcı
+#                         istatistikleri
+#   GET  /healthz
+
+DEFAULT_PORT = 8080
+DEFAULT_BATCH_WINDOW_MS = 10.0
+DEFAULT_MAX_BATCH = 16
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_MAX_IN_FLIGHT_BATCHES = 8
+DEFAULT_REQUEST_TIMEOUT = 120.0
+MAX_BODY_BYTES = 16 * 1024 * 1024
+THROUGHPUT_WINDOW_S = 60.0
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.items = 0
+        self.rejected = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.batches = 0
+        self.batch_items = 0
+        self.max_batch_size = 0
+        self.deduplicated = 0
+        self.max_queue_depth = 0
+        self.request_latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.batch_latency = LatencyHistogram()
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self, items, latency_s, errors=0):
+        now = time.time()
+        with self._lock:
+            self.requests += 1
+            self.items += items
+            self.errors += errors
+            self.request_latency.add(latency_s)
+            self._recent.append((now, items))
+            while self._recent and self._recent[0][0] < now - THROUGHPUT_WINDOW_S:
+                self._recent.popleft()
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_queue_depth(self, depth):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record_batch(self, size, unique, waits, latency_s):
+        with self._lock:
+            self.batches += 1
+            self.batch_items += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.deduplicated += size - unique
+            self.batch_latency.add(latency_s)
+            for wait in waits:
+                self.queue_wait.add(wait)
+
+    @staticmethod
+    def _percentiles(histogram):
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {"count": histogram.count, "mean_ms": ms(histogram.mean()), "p50_ms": ms(histogram.percentile(50)),
+                "p95_ms": ms(histogram.percentile(95)), "p99_ms": ms(histogram.percentile(99)),
+                "max_ms": ms(histogram.max if histogram.count else None)}
+
+    def snapshot(self, queue_depth=0, in_flight_batches=0):
+        now = time.time()
+        with self._lock:
+            uptime = now - self.started
+            recent = [n for ts, n in self._recent if ts >= now - THROUGHPUT_WINDOW_S]
+            window = min(THROUGHPUT_WINDOW_S, uptime) or 1.0
+            return {
+                "uptime_s": round(uptime, 1),
+                "requests": self.requests,
+                "items": self.items,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "throughput": {
+                    "requests_per_s": round(len(recent) / window, 2),
+                    "items_per_s": round(sum(recent) / window, 2),
+                    "window_s": round(window, 1),
+                },
+                "latency": self._percentiles(self.request_latency),
+                "queue": {"depth": queue_depth, "max_depth": self.max_queue_depth,
+                          "wait": self._percentiles(self.queue_wait)},
+                "batches": {"count": self.batches, "in_flight": in_flight_batches,
+                            "mean_size": round(self.batch_items / self.batches, 2) if self.batches else None,
+                            "max_size": self.max_batch_size, "deduplicated_items": self.deduplicated,
+                            "latency": self._percentiles(self.batch_latency)},
+            }
+
+
+def prediction_result(item, prediction=None, error=None):
+    result = {"id": item.get("id")}
+    if error is None and getattr(prediction, "intent", None) is None:
+        error = ValueError(getattr(prediction, "error", None) or "Geçersiz etiket")
+    if error is None:
+        result["intent"] = str(prediction.intent).strip().lower()
+        result["status"] = "ok"
+    else:
+        result["status"] = "error"
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+class MicroBatcher:
+    """Gelen atıfları pencere/boyut sınırına göre toplar ve sınırlı sayıda eşzamanlı toplu gönderimle işler."""
+
+    def __init__(self, classify_batch, metrics, window_s=DEFAULT_BATCH_WINDOW_MS / 1000, max_batch=DEFAULT_MAX_BATCH,
+                 max_queue=DEFAULT_MAX_QUEUE, max_in_flight_batches=DEFAULT_MAX_IN_FLIGHT_BATCHES):
+        self.classify_batch = classify_batch
+        self.metrics = metrics
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Tüm gönderim yuvaları doluysa toplayıcı bekler; kuyruk dolar ve yeni istekler 429 alır
+        self._slots = threading.BoundedSemaphore(max_in_flight_batches)
+        self._in_flight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight_batches, thread_name_prefix="batch")
+        self._collector = threading.Thread(target=self._collect, name="batch-collector", daemon=True)
+        self._collector.start()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def in_flight_batches(self):
+        with self._cond:
+            return self._in_flight
+
+    def submit(self, items):
+        """Atıfları kuyruğa ekler ve her biri için bir Future döndürür; yer yoksa hiçbirini eklemeden QueueFull fırlatır."""
+        futures = [Future() for _ in items]
+        now = time.perf_counter()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Servis kapanıyor.")
+            if len(self._queue) + len(items) > self.max_queue:
+                raise QueueFull(f"Kuyruk dolu ({len(self._queue)}/{self.max_queue}).")
+            self._queue.extend((item, future, now) for item, future in zip(items, futures))
+            self.metrics.record_queue_depth(len(self._queue))
+            self._cond.notify()
+        return futures
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            # İlk atıf geldikten sonra pencere dolana veya toplu gönderim boyutuna ulaşılana kadar beklenir
+            deadline = self._queue[0][2] + self.window_s
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._in_flight += 1
+            return [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+    def _collect(self):
+        while True:
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                self._slots.release()
+                return
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        started = time.perf_counter()
+        try:
+            # Aynı toplu gönderimdeki özdeş atıflar bir kez sınıflandırılır
+            unique = {}
+            for item, _, _ in batch:
+                unique.setdefault((item["citation"], item.get("section", "")), len(unique))
+            keys = list(unique)
+            try:
+                predictions = self.classify_batch(keys)
+                errors = [None] * len(keys)
+            except Exception as e:
+                predictions, errors = [None] * len(keys), [e] * len(keys)
+            for item, future, _ in batch:
+                n = unique[(item["citation"], item.get("section", ""))]
+                future.set_result(prediction_result(item, predictions[n], errors[n]))
+            self.metrics.record_batch(len(batch), len(keys), [started - queued for _, _, queued in batch],
+                                      time.perf_counter() - started)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+
+
+class FailedPrediction:
+    def __init__(self, error):
+        self.intent = None
+        self.error = f"{type(error).__name__}: {error}"
+
+
+def _pack_size(program):
+    return getattr(program, "pack_size", None) if hasattr(program, "forward_many") else None
+
+
+def scheduled_call(program):
+    """Planlayıcının çağıracağı fonksiyon: paketleyen programda forward_many(items=...), diğerlerinde forward."""
+    return program.forward_many if _pack_size(program) else program.forward
+
+
+def batch_classifier(program, scheduler, loop):
+    """Toplu gönderim fonksiyonu: atıfları paketlere (veya tek tek) böler ve her LM isteğini planlayıcıya verir.
+
+    Yeniden denemeler tükenir veya kalıcı bir hata olursa yalnızca ilgili paketin/atıfın tahmini FailedPrediction olur.
+    """
+    pack_size = _pack_size(program)
+
+    async def classify_async(keys):
+        if pack_size:
+            groups = [keys[i:i + pack_size] for i in range(0, len(keys), pack_size)]
+            results = await asyncio.gather(*(scheduler.submit(items=group) for group in groups),
+                                           return_exceptions=True)
+        else:
+            # Paketleme yoksa toplu gönderim yalnızca kuyruklamayı birleştirir; her atıf ayrı bir LM isteğidir
+            groups = [[key] for key in keys]
+            results = await asyncio.gather(*(scheduler.submit(citation=key[0], section=key[1]) for key in keys),
+                                           return_exceptions=True)
+            results = [result if isinstance(result, BaseException) else [result] for result in results]
+        predictions = []
+        for group, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                predictions.extend(FailedPrediction(result) for _ in group)
+            else:
+                predictions.extend(result)
+        return predictions
+
+    def classify(keys):
+        # Planlayıcının kovaları ve eşzamanlılık sınırı tek bir olay döngüsünde yaşar; gönderim iş parçacıkları bekler
+        return asyncio.run_coroutine_threadsafe(classify_async(keys), loop).result()
+
+    return classify
+
+
+class ClassificationService:
+    def __init__(self, program, window_s=DEFAULT_BATCH_WINDOW_MS / 1000, max_batch=DEFAULT_MAX_BATCH,
+                 max_queue=DEFAULT_MAX_QUEUE, max_in_flight_batches=DEFAULT_MAX_IN_FLIGHT_BATCHES,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, scheduler=None):
+        self.metrics = ServiceMetrics()
+        self.request_timeout = request_timeout
+        # Planlayıcı verilmezse modele özgü olmayan varsayılan kotalarla kurulur (bkz. scheduler.DEFAULT_RATE_LIMITS)
+        self.scheduler = scheduler or RateLimitedScheduler.for_model(
+            scheduled_call(program), None, initial_concurrency=max_batch,
+            max_concurrency=max_batch * max_in_flight_batches,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="scheduler", daemon=True)
+        self._loop_thread.start()
+        self.batcher = MicroBatcher(batch_classifier(program, self.scheduler, self._loop), self.metrics, window_s,
+                                    max_batch, max_queue, max_in_flight_batches)
+
+    def classify(self, items):
+        """Atıfları sınıflandırır; kuyruk doluysa QueueFull, süre aşılırsa TimeoutError fırlatır."""
+        started = time.perf_counter()
+        try:
+            futures = self.batcher.submit(items)
+        except QueueFull:
+            self.metrics.record_rejected()
+            raise
+        deadline = started + self.request_timeout
+        try:
+            results = [future.result(timeout=max(0.0, deadline - time.perf_counter())) for future in futures]
+        except FutureTimeoutError:
+            self.metrics.record_timeout()
+            raise TimeoutError(f"İstek {self.request_timeout} sn içinde tamamlanamadı.")
+        latency = time.perf_counter() - started
+        for result in results:
+            result["latency_s"] = round(latency, 4)
+        self.metrics.record_request(len(items), latency, errors=sum(r["status"] != "ok" for r in results))
+        return results
+
+    def snapshot(self):
+        snapshot = self.metrics.snapshot(self.batcher.queue_depth(), self.batcher.in_flight_batches())
+        snapshot["scheduler"] = self.scheduler.summary()
+        return snapshot
+
+    def close(self):
+        self.batcher.close()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self.scheduler.close()
+
+
+def parse_items(payload):
+    """İstek gövdesinden atıf listesi ve isteğin toplu olup olmadığını döndürür; geçersizse ValueError fırlatır."""
+    bulk = isinstance(payload, list) or (isinstance(payload, dict) and "items" in payload)
+    items = payload if isinstance(payload, list) else payload.get("items") if bulk else [payload]
+    if not isinstance(items, list) or not items:
+        raise ValueError("'items' boş olmayan bir liste olmalıdır.")
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("citation"), str):
+            raise ValueError("Her öğe 'citation' (metin) alanı içeren bir nesne olmalıdır.")
+        if not isinstance(item.get("section", ""), str):
+            raise ValueError("'section' alanı metin olmalıdır.")
+    return items, bulk
+
+
+class ClassificationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # İstek başına erişim logu yazılmaz; sayılar /metrics'te
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.service.snapshot())
+        else:
+            self._send_json(404, {"error": "Bulunamadı"})
+
+    def do_POST(self):
+        if self.path not in ("/classify", "/classify/bulk"):
+            self._send_json(404, {"error": "Bulunamadı"})
+            return
+        length = (self.headers.get("Content-Length") or "0").strip()
+        if not (length.isascii() and length.isdigit()):
+            # Gövdenin nerede bittiği bilinmediği için bağlantı yeniden kullanılamaz
+            self.close_connection = True
+            self._send_json(400, {"error": "Geçersiz Content-Length başlığı."})
+            return
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": f"İstek gövdesi en fazla {MAX_BODY_BYTES} bayt olabilir."})
+            return
+        try:
+            items, bulk = parse_items(json.loads(self.rfile.read(length) or b"null"))
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        service = self.server.service
+        if len(items) > service.batcher.max_queue:
+            self._send_json(413, {"error": f"Tek istekte en fazla {service.batcher.max_queue} atıf gönderilebilir."})
+            return
+        try:
+            results = service.classify(items)
+        except QueueFull as e:
+            self._send_json(429, {"error": str(e)}, headers={"Retry-After": "1"})
+            return
+        except TimeoutError as e:
+            self._send_json(504, {"error": str(e)})
+            return
+        except RuntimeError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        if bulk or self.path == "/classify/bulk":
+            self._send_json(200, {"results": results})
+        else:
+            self._send_json(200, results[0])
+
+
+class ClassificationHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Varsayılan dinleme kuyruğu (5) eşzamanlı istemcilerde bağlantı reddine yol açar
+    request_queue_size = 256
+
+
+def create_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ClassificationHTTPServer((host, port), ClassificationRequestHandler)
+    server.service = service
+    return server
+
+
+def run_load_test(url, rows, requests, concurrency, bulk_size=1, timeout=DEFAULT_REQUEST_TIMEOUT):
+    """Sunucuya eşzamanlı istemcilerden istek gönderir; istemci tarafı throughput ve gecikme yüzdeliklerini döndürür."""
+    import urllib.error
+    import urllib.request
+
+    latencies = LatencyHistogram()
+    counts = {"ok": 0, "rejected": 0, "error": 0}
+    lock = threading.Lock()
+    endpoint = url.rstrip("/") + ("/classify/bulk" if bulk_size > 1 else "/classify")
+
+    def send(n):
+        chunk = [rows[(n * bulk_size + j) % len(rows)] for j in range(bulk_size)]
+        payload = {"items": chunk} if bulk_size > 1 else chunk[0]
+        request = urllib.request.Request(endpoint, data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+            outcome = "ok"
+        except urllib.error.HTTPError as e:
+            outcome = "rejected" if e.code == 429 else "error"
+        except OSError:
+            outcome = "error"
+        with lock:
+            counts[outcome] += 1
+            if outcome == "ok":
+                latencies.add(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {"requests": requests, "elapsed_s": round(elapsed, 3), "requests_per_s": round(requests / elapsed, 2),
+            "items_per_s": round(counts["ok"] * bulk_size / elapsed, 2), **counts,
+            "latency": ServiceMetrics._percentiles(latencies)}
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Yüklenecek optimize edilmiş program dosyası")
+    add_retrieval_argument(parser)
+    parser.add_argument("--pack-size", type=int, help="Her toplu gönderimi PackedClassifyCitation ile bu boyutta paketlere böl, her paket tek LM isteği (verilmezse toplama yalnızca kuyruklamayı birleştirir, her atıf ayrı istektir)")
+    parser.add_argument("--rpm", type=int, help="Dakikalık istek bütçesi (varsayılan: modele göre)")
+    parser.add_argument("--tpm", type=int, help="Dakikalık token bütçesi (varsayılan: modele göre)")
+    parser.add_argument("--host", default="127.0.0.1", help="Dinlenecek adres")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Dinlenecek port (0: boş bir port seç)")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW_MS, help="İlk atıftan sonra toplu gönderim için beklenecek azami süre (ms)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Bir toplu gönderimdeki en fazla atıf")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Kuyrukta bekleyebilecek en fazla atıf; aşılırsa 429 döner")
+    parser.add_argument("--max-in-flight-batches", type=int, default=DEFAULT_MAX_IN_FLIGHT_BATCHES, help="Aynı anda işlenen en fazla toplu gönderim")
+    parser.add_argument("--request-timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT, help="İstek başına azami bekleme (sn), aşılırsa 504 döner")
+    parser.add_argument("--load-test", type=int, metavar="N", help="Sunucuyu başlatıp devset atıflarıyla N istek gönder, sonuçları raporla ve kapat")
+    parser.add_argument("--load-concurrency", type=int, default=32, help="Yük testinde eşzamanlı istemci sayısı")
+    parser.add_argument("--load-bulk-size", type=int, default=1, help="Yük testinde istek başına atıf (1: tekli uç nokta)")
+    parser.add_argument("--devset", default=CSV_DEV_PATH, help="Yük testinde kullanılacak CSV dosyası")
+    return parser
+
+
+def load_service_program(args):
+    from .optimize import load_program
+
+    if args.pack_size:
+        from .packing import copy_instructions
+        from .program import PackedClassifyCitation
+
+        program = PackedClassifyCitation(args.pack_size)
+        copy_instructions(args.program, program)
+        return program
+    return load_program(args.program, retrieval_k=args.retrieval_k)
+
+
+def run(args):
+    from .lm import build_lm
+
+    # Yeniden denemeleri planlayıcı yönetir, litellm'in kendi denemeleri kapatılır
+    _, response_cache = build_lm(args, num_retries=0)
+    program = load_service_program(args)
+    scheduler = RateLimitedScheduler.for_model(
+        scheduled_call(program), args.model, requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+        initial_concurrency=args.max_batch, max_concurrency=args.max_batch * args.max_in_flight_batches,
+    )
+    service = ClassificationService(
+        program,
+        window_s=args.batch_window_ms / 1000, max_batch=args.max_batch, max_queue=args.max_queue,
+        max_in_flight_batches=args.max_in_flight_batches, request_timeout=args.request_timeout, scheduler=scheduler,
+    )
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}"
+    print(f"Sınıflandırma servisi {url} adresinde dinliyor (POST /classify, /classify/bulk; GET /metrics, /healthz).")
+
+    try:
+        if args.load_test:
+            from .data import load_columnar_dataset
+
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            dataset = load_columnar_dataset(args.devset)
+            rows = [{"id": str(i), "citation": dataset.value("citation_context", i), "section": dataset.value("section", i)}
+                    for i in range(len(dataset))]
+            result = run_load_test(url, rows, args.load_test, args.load_concurrency, args.load_bulk_size,
+                                   args.request_timeout)
+            print("Yük testi (istemci tarafı):")
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.load_test:
+            server.shutdown()
+        server.server_close()
+        service.close()
+        print("Servis metrikleri:")
+        print(json.dumps(service.snapshot(), ensure_ascii=False, indent=2))
+        if response_cache is not None:
+            response_cache.report()
+    return 0
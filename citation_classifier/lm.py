@@ -0,0 +1,53 @@
+from .config import CSV_DEV_PATH, CSV_TRAIN_PATH, api_key_for
+
+
+def add_lm_arguments(parser):
+    group = parser.add_argument_group("LM")
+    group.add_argument("--model", help="Kullanılacak LM (varsayılan: config.DEFAULT_MODEL)")
+    group.add_argument("--cache-path", default="lm_cache.sqlite", help="Kalıcı LM yanıt önbelleği (SQLite) dosyası")
+    group.add_argument("--cache-max-mb", type=float, default=512, help="Önbelleğin azami boyutu (MB), aşılınca LRU ile çıkarılır")
+    group.add_argument("--no-cache", action="store_true", help="Kalıcı LM önbelleğini devre dışı bırak")
+    group.add_argument("--fake-lm", action="store_true", help="API yerine deterministik yerel sahte LM kullan (ücretsiz, çevrimdışı)")
+    group.add_argument("--fake-latency", type=float, default=0.0, help="Sahte LM çağrı gecikmesi (sn)")
+    group.add_argument("--fake-error-rate", type=float, default=0.0, help="Sahte LM hata oranı (0-1)")
+    group.add_argument("--fake-rpm", type=int, help="Sahte LM dakikalık istek sınırı (aşılınca 429)")
+    group.add_argument("--telemetry", help="Her LM çağrısını (gecikme, token, önbellek, aşama, intent) bu JSONL dosyasına yaz")
+    group.add_argument("--fake-prompt-sensitivity", type=float, default=0.0,
+                       help="Sahte LM doğruluğunun talimat/demolara göre değişim genliği (optimizasyon denemeleri için)")
+    return parser
+
+
+def build_lm(args, **lm_kwargs):
+    """Argümanlara göre LM'i (sahte, önbellekli veya düz) oluşturur ve dspy'a tanıtır.
+
+    (lm, response_cache) döndürür; önbellek kullanılmıyorsa response_cache None'dır.
+    """
+    import dspy
+
+    response_cache = None
+    if args.fake_lm:
+        from .fake_lm import FakeLM, load_oracle
+
+        lm = FakeLM(
+            oracle=load_oracle(CSV_TRAIN_PATH, CSV_DEV_PATH),
+            latency_s=args.fake_latency,
+            error_rate=args.fake_error_rate,
+            requests_per_minute=args.fake_rpm,
+            prompt_sensitivity=args.fake_prompt_sensitivity,
+            **lm_kwargs,
+        )
+        print(f"Sahte LM kullanılıyor: {lm.config()}")
+    elif args.no_cache:
+        lm = dspy.LM(args.model, api_key=api_key_for(args.model), **lm_kwargs)
+    else:
+        from .cache import CachedLM, LMResponseCache
+
+        response_cache = LMResponseCache(args.cache_path, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        lm = CachedLM(args.model, response_cache, api_key=api_key_for(args.model), **lm_kwargs)
+
+    dspy.configure(lm=lm)
+    if args.telemetry:
+        from .telemetry import install_telemetry
+
+        install_telemetry(args.telemetry)
+    return lm, response_cache
@@ -0,0 +1,13 @@
+# Metric tanımı (örnek eşleşme kontrolü)
+def exact_match_metric(example, prediction, trace=None):
+    try:
+        ground_truth = str(example.citation_intent).strip().lower()
+        predicted_intent = str(prediction.intent).strip().lower()
+        is_match = ground_truth == predicted_intent
+        return int(is_match)
+    except AttributeError:
+        return 0
+    except Exception as e:
+        print(f"Error in metric: {e}")
+        # print(f"Example: {example} - Prediction: {prediction}")
+        return 0
@@ -0,0 +1,294 @@
+import traceback
+
+from .config import (
+    CHECKPOINT_DIR, CITATION_CLASSES, CSV_DEV_PATH, CSV_TRAIN_PATH, MIN_TRAINSET_SIZE_FOR_MIPRO, save_path,
+)
+
+# Test verisi
+EXAMPLE_DATA = {
+    "citation": "Yöntemimiz, literatürdeki yaklaşımlarla benzer sonuçlar üretmektedir (Çelik ve Aydın, 2022).",
+    "section": "Bulgular"
+}
+
+SEPARATOR = "------------------------------------------------------------"
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Başlangıç programı ve optimize edilmiş programın kaydedileceği dosya")
+    parser.add_argument("--auto", default="heavy", choices=["light", "medium", "heavy", "none"],
+                        help="MIPROv2 arama bütçesi ('none': --num-candidates/--num-trials kullanılır)")
+    parser.add_argument("--num-candidates", type=int, default=6, help="--auto none ile talimat/demo adayı sayısı")
+    parser.add_argument("--num-trials", type=int, default=15, help="--auto none ile deneme sayısı")
+    parser.add_argument("--max-bootstrapped-demos", type=int, default=6, help="trainset'ten seçilecek demo sayısı")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="Demo kümeleri, talimat adayları ve deneme skorlarının kaydedildiği dizin")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Checkpoint kullanmadan (eski davranış) optimize et")
+    parser.add_argument("--fresh", action="store_true", help="Var olan checkpoint'i silip sıfırdan başla")
+    parser.add_argument("--processes", type=int, default=1, help="Aday değerlendirmelerini bu kadar süreçte paralel çalıştır")
+    parser.add_argument("--no-minibatch", action="store_true", help="Her denemeyi minibatch yerine tam valset üzerinde değerlendir")
+    parser.add_argument("--racing", action="store_true", help="Tam valset değerlendirmelerinde, en iyiyi geçemeyeceği belli olan adayları erken ele")
+    parser.add_argument("--racing-delta", type=float, default=0.05, help="Erken elemede izin verilen hata olasılığı")
+    parser.add_argument("--racing-min-batch", type=int, default=20, help="Yarışta ilk parçanın örnek sayısı (her adımda iki katına çıkar)")
+    parser.add_argument("--racing-verify", action="store_true", help="Sonunda elenen adayları tam değerlendirip seçimin değişmediğini doğrula")
+    return parser
+
+
+def load_program(path, retrieval_k=None):
+    from .program import ClassifyCitation
+
+    program = ClassifyCitation() # Varsayılan, optimize edilmemiş program
+    try:
+        program.load(path)
+        print(f"Optimize edilmiş program '{path}' dosyasından başarıyla yüklendi.")
+    except Exception as e:
+        print(f"Program yüklenirken bir hata oluştu: {e}")
+        program = ClassifyCitation() # Optimize edilmemiş haliyle yükle
+
+    if retrieval_k is not None:
+        from .retrieval import load_or_build_demo_index, resolve_retrieval_k
+
+        retrieval_k = resolve_retrieval_k(retrieval_k, len(program.classifier.predict.demos))
+        program.demo_index = load_or_build_demo_index(path)
+        program.num_demos = retrieval_k
+        print(f"Dinamik demo seçimi etkin: her sorgu için en benzer {retrieval_k} örnek kullanılacak.")
+    return program
+
+
+def optimize_program(program, trainset, devset, program_path, auto="heavy", max_bootstrapped_demos=6,
+                     checkpoint_dir=None, fresh=False, processes=1, lm_args=None,
+                     racing=False, racing_delta=0.05, racing_min_batch=20, racing_verify=False, minibatch=True,
+                     num_candidates=6, num_trials=15):
+    """MIPROv2 ile optimize eder; (program, optimize_edildi_mi) döndürür.
+
+    checkpoint_dir verilirse ilerleme diske yazılır ve yarıda kalan çalıştırma kaldığı yerden devam eder;
+    processes > 1 ise aday değerlendirmeleri (lm_args ile kurulan LM'lerle) yerel süreç havuzunda yapılır;
+    racing ise tam valset değerlendirmeleri büyüyen parçalarla yapılıp umutsuz adaylar erken elenir.
+    """
+    from dspy.teleprompt import MIPROv2
+
+    from .metrics import exact_match_metric
+
+    if len(trainset) < MIN_TRAINSET_SIZE_FOR_MIPRO:
+        print(f"UYARI: Trainset boyutu ({len(trainset)}) Optimizasyonu için çok küçük. Optimizasyon atlanıyor, varsayılan program kullanılacak.")
+        return program, False
+
+    print(f"Optimizasyonu {len(trainset)} eğitim örneği ile başlatılıyor...")
+    # auto modunda MIPROv2 minibatch kullanımını ve deneme sayısını kendisi belirler
+    search_kwargs, compile_kwargs = {"auto": auto}, {}
+    if auto == "none":
+        search_kwargs = {"auto": None, "num_candidates": num_candidates}
+        compile_kwargs = {"num_trials": num_trials}
+    process_pool = checkpoint = None
+    extended = bool(checkpoint_dir or processes > 1 or racing)
+    if extended:
+        import dspy
+
+        from .checkpoint import CheckpointedMIPROv2, OptimizationCheckpoint, ProcessPoolEvaluator
+        from .racing import RacingEvaluator
+
+        if checkpoint_dir:
+            checkpoint = OptimizationCheckpoint(checkpoint_dir)
+            if fresh:
+                checkpoint.clear()
+        if processes > 1:
+            process_pool = ProcessPoolEvaluator(lm_args, exact_match_metric, processes)
+            print(f"Aday değerlendirmeleri {processes} süreçte paralel yapılacak.")
+        racing_settings = {"delta": racing_delta, "min_batch": racing_min_batch} if racing else None
+        optimizer = CheckpointedMIPROv2(
+            metric=exact_match_metric,
+            verbose=True,
+            checkpoint=checkpoint,
+            process_pool=process_pool,
+            racing=RacingEvaluator(racing_delta, racing_min_batch) if racing else None,
+            run_settings={"model": getattr(dspy.settings.lm, "model", None), "racing": racing_settings,
+                          "minibatch": minibatch, **compile_kwargs, **search_kwargs},
+            **search_kwargs,
+        )
+    else:
+        optimizer = MIPROv2(
+            metric=exact_match_metric,
+            verbose=True,
+            **search_kwargs,
+        )
+
+    try:
+        compiled_program = optimizer.compile(
+            student=program,
+            trainset=trainset,
+            valset=devset,
+            max_bootstrapped_demos=max_bootstrapped_demos,  # trainset'ten seçilecek demo sayısı
+            max_labeled_demos=0,                # Eğer manuel demo vermiyorsanız 0
+            minibatch=minibatch,
+            **compile_kwargs,
+            # API kullanılmadan önce onay isteme için
+            requires_permission_to_run=False,
+        )
+        compiled_program.save(program_path)
+        print("Optimizer çalıştırıldı, optimize edildi ve kaydedildi...")
+        if racing and racing_verify:
+            optimizer.verify_racing()
+        if checkpoint is not None:
+            # Kaydedilen program bir sonraki çalıştırmanın öğrencisi olur; eski checkpoint onu engellememeli
+            print(f"Tamamlanan çalıştırmanın checkpoint'i '{checkpoint.archive()}' dizinine taşındı.")
+        return compiled_program, True
+
+    except Exception as e:
+        print(f"Optimizasyonu sırasında bir hata oluştu: {e}")
+        traceback.print_exc()
+        if checkpoint_dir:
+            print(f"İlerleme '{checkpoint_dir}' dizininde; aynı komut tekrar çalıştırılınca kaldığı yerden devam eder.")
+        print("Optimizasyon başarısız oldu, varsayılan program kullanılacak.")
+        return program, False
+
+    finally:
+        if extended:
+            optimizer.report()
+        if process_pool is not None:
+            process_pool.close()
+
+
+def show_example_prediction(program):
+    print("\n\n" + SEPARATOR)
+    print(SEPARATOR)
+    print("--- Program Çıktısı ---")
+    try:
+        result = program.forward(citation=EXAMPLE_DATA["citation"], section=EXAMPLE_DATA["section"])
+        print("Tahmin edilen intent:", result.intent if hasattr(result, 'intent') else "N/A")
+        if hasattr(result, 'reasoning') and result.reasoning:
+            print("Gerekçe:", result.reasoning)
+        elif hasattr(result, 'rationale') and result.rationale: # ChainOfThought için fallback
+            print("Gerekçe (rationale):", result.rationale)
+        else:
+            print("Gerekçe üretilmedi veya bulunamadı.")
+
+    except Exception as e:
+        print(f"Program çalıştırılırken bir hata oluştu: {e}")
+
+
+def show_optimized_prompt(program, program_was_optimized):
+    import dspy
+
+    print(SEPARATOR)
+    print(SEPARATOR)
+    print("--- Optimize Edilmiş Prompt (Classifier) ---")
+
+    if not program_was_optimized:
+        print("Program optimize edilmedi (trainset boyutu yetersiz veya optimizasyon atlandı).")
+        return
+    if not hasattr(program, 'classifier'):
+        print("Optimize edilmiş programda 'classifier' (ChainOfThought modülü) özniteliği bulunamadı.")
+        return
+
+    print(f"Optimize edilmiş programın türü: {type(program)}")
+
+    chain_of_thought_module = program.classifier
+    print(f"Optimize edilmiş programın Classifier (ChainOfThought) modülü bulundu. Türü: {type(chain_of_thought_module)}")
+
+    # ChainOfThought'un içindeki ana Predict modülüne erişelim
+    # Debugger görüntüsüne göre bu özellik 'predict' (küçük harf) olarak adlandırılmış.
+    internal_predict_module = None
+    if hasattr(chain_of_thought_module, 'predict') and isinstance(chain_of_thought_module.predict, dspy.Predict): # 'predictor' yerine 'predict'
+        internal_predict_module = chain_of_thought_module.predict
+        print("ChainOfThought modülü içinde 'predict' (dspy.Predict modülü) bulundu.")
+    else:
+        print(f"ChainOfThought modülü içinde 'predict' (dspy.Predict modülü) bulunamadı. 'predict' özelliği var mı? {hasattr(chain_of_thought_module, 'predict')}")
+        if hasattr(chain_of_thought_module, 'predict'):
+            print(f"'predict' özelliğinin türü: {type(chain_of_thought_module.predict)}")
+
+
+    if internal_predict_module:
+        # 1. Signature'daki talimatları yazdır
+        if hasattr(internal_predict_module, 'signature') and internal_predict_module.signature:
+            print("\nInternal Predict Modülünün Signature'ı (Talimatlar):")
+            print(str(internal_predict_module.signature))
+            if internal_predict_module.signature.instructions:
+                 print("\nSadece Talimatlar (Instructions):")
+                 print(internal_predict_module.signature.instructions)
+        else:
+            print("Internal Predict Modülünde signature bulunamadı.")
+
+        # 2. Kullanılan demoları (eğer varsa) yazdır
+        if hasattr(internal_predict_module, 'demos') and internal_predict_module.demos:
+            print(f"\nKullanılan Demo Sayısı (Internal Predict Modülü): {len(internal_predict_module.demos)}")
+            print("Demolar:")
+            for i, demo in enumerate(internal_predict_module.demos):
+                print(f"--- Demo {i+1} ---")
+                # Demo içeriğini daha okunaklı yazdırmak için
+                # dspy.Example nesnelerinin içini görmek gerekebilir.
+                # print(demo)
+                # Demo'nun input ve output alanlarını gösterelim (Signature'daki alan adlarına göre)
+                demo_inputs_str = []
+                for k_sig, _ in internal_predict_module.signature.input_fields.items():
+                    if k_sig in demo:
+                        demo_inputs_str.append(f"  {k_sig}: {demo[k_sig]}")
+                print(" Inputs:\n" + "\n".join(demo_inputs_str))
+
+                demo_outputs_str = []
+                for k_sig, _ in internal_predict_module.signature.output_fields.items():
+                     if k_sig in demo:
+                        demo_outputs_str.append(f"  {k_sig}: {demo[k_sig]}")
+                print(" Outputs:\n" + "\n".join(demo_outputs_str))
+        else:
+            print("\nInternal Predict Modülünde demo bulunamadı.")
+
+        # ... (Tahmini Tam Prompt Yapısı kısmı aynı kalabilir, internal_predict_module kullanacak)
+
+    else:
+        print("\nChainOfThought içindeki ana Predict modülü (internal_predict_module) bulunamadı.")
+
+
+def run(args):
+    import dspy
+
+    from .data import load_and_prepare_trainset
+    from .lm import build_lm
+    from .telemetry import set_stage
+
+    lm, response_cache = build_lm(args)
+    program = load_program(args.program)
+
+    # Initialization for training set
+    trainset = load_and_prepare_trainset(
+        csv_path=CSV_TRAIN_PATH,
+        citation_classes=CITATION_CLASSES,
+        get_all_samples=True
+    )
+
+    devset = load_and_prepare_trainset(
+        csv_path=CSV_DEV_PATH,
+        citation_classes=CITATION_CLASSES,
+        get_all_samples=True
+    )
+
+    # MIPRO ile optimize et
+    program, program_was_optimized = optimize_program(
+        program, trainset, devset, args.program,
+        auto=args.auto, max_bootstrapped_demos=args.max_bootstrapped_demos,
+        checkpoint_dir=None if args.no_checkpoint else args.checkpoint_dir,
+        fresh=args.fresh, processes=args.processes, lm_args=args,
+        racing=args.racing, racing_delta=args.racing_delta, racing_min_batch=args.racing_min_batch,
+        racing_verify=args.racing_verify, minibatch=not args.no_minibatch,
+        num_candidates=args.num_candidates, num_trials=args.num_trials,
+    )
+    set_stage("inference")
+
+    show_example_prediction(program)
+    show_optimized_prompt(program, program_was_optimized)
+
+    # LM'in son çağrılarını incelemek için (debugging)
+    print(SEPARATOR)
+    print(SEPARATOR)
+    print("--- LM Son Çağrılar (Son 1) ---")
+    try:
+        lm.inspect_history(n=1)
+    except Exception as e:
+        print(f"LM geçmişi incelenirken hata: {e}")
+
+    if response_cache is not None:
+        print(SEPARATOR)
+        print(SEPARATOR)
+        response_cache.report()
+
+    print(SEPARATOR)
+    print(SEPARATOR)
+    print("Program tamamlandı. dspy.__version__ " + str(dspy.__version__))
+    return 0
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+from .config import CSV_DEV_PATH
+
+# Çoklu atıf paketleme: uzun CitationIntentSignature talimatları her atıf için ayrı ayrı gönderilmesin diye
+# N (atıf, bölüm) çifti tek LM isteğinde sınıflandırılır (program.PackedClassifyCitation). Bu modül paket boyutu
+# taramasını (atıf başına token, doğruluk) yapar.
+
+SWEEP_PACK_SIZES = [1, 4, 8, 16]
+
+
+def lm_usage_since(lm, history_start):
+    prompt_tokens = completion_tokens = 0
+    for entry in lm.history[history_start:]:
+        usage = entry.get("usage") or {}
+        prompt_tokens += usage.get("prompt_tokens", 0) or 0
+        completion_tokens += usage.get("completion_tokens", 0) or 0
+    return prompt_tokens, completion_tokens
+
+
+def sweep_pack_sizes(lm, rows, pack_sizes=SWEEP_PACK_SIZES, program_path=None):
+    """Her paket boyutu için atıf başına token, LM isteği sayısı ve doğruluk."""
+    import dspy
+
+    from .program import PackedClassifyCitation
+
+    results = []
+    items = [(citation, section) for citation, section, _ in rows]
+    for pack_size in pack_sizes:
+        module = PackedClassifyCitation(pack_size)
+        if program_path:
+            copy_instructions(program_path, module)
+        history_start = len(lm.history)
+        started = time.perf_counter()
+        predictions = []
+        for pack_start in range(0, len(items), pack_size):
+            pack = items[pack_start:pack_start + pack_size]
+            try:
+                predictions.extend(module.forward_many(pack))
+            except Exception as e:
+                # Geçici LM hatası: paket bölünmez, tamamı sınıflanamamış sayılır
+                predictions.extend(dspy.Prediction(intent=None, error=f"{type(e).__name__}: {e}") for _ in pack)
+        wall = time.perf_counter() - started
+        prompt_tokens, completion_tokens = lm_usage_since(lm, history_start)
+        correct = sum(p.intent == gold for p, (_, _, gold) in zip(predictions, rows))
+        results.append({
+            "pack_size": pack_size,
+            "lm_requests": module.requests,
+            "splits": module.splits,
+            "unclassified": sum(p.intent is None for p in predictions),
+            "prompt_tokens_per_citation": round(prompt_tokens / len(rows), 1),
+            "completion_tokens_per_citation": round(completion_tokens / len(rows), 1),
+            "accuracy": round(correct / len(rows), 4),
+            "wall_s": round(wall, 3),
+        })
+    return results
+
+
+def copy_instructions(program_path, module):
+    # Optimize edilmiş talimatlar varsa paketlenmiş imzaya da uygulanır (demolar tek atıflık olduğu için taşınmaz)
+    if not os.path.exists(program_path):
+        return
+    with open(program_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    instructions = state.get("classifier.predict", {}).get("signature", {}).get("instructions")
+    if instructions:
+        predict = module.classifier.predict
+        predict.signature = predict.signature.with_instructions(instructions)
+
+
+def add_arguments(parser):
+    parser.add_argument("--devset", default=CSV_DEV_PATH, help="Ölçüm için kullanılacak CSV dosyası")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SWEEP_PACK_SIZES, help="Denenecek paket boyutları")
+    parser.add_argument("--program", help="Talimatları paketlenmiş imzaya aktarılacak optimize edilmiş program dosyası")
+    parser.add_argument("--limit", type=int, help="Yalnızca ilk N satırı kullan")
+    return parser
+
+
+def run(args):
+    from .cascade import read_labeled_rows
+    from .lm import build_lm
+
+    lm, response_cache = build_lm(args)
+    rows = read_labeled_rows(args.devset)[:args.limit]
+    print(f"Paket boyutu taraması ('{args.devset}', {len(rows)} atıf):")
+    print("  paket   istek   bölme   sınıflanamayan   prompt_tok/atıf   tamamlama_tok/atıf   doğruluk")
+    for r in sweep_pack_sizes(lm, rows, args.sizes, program_path=args.program):
+        print(f"  {r['pack_size']:<7} {r['lm_requests']:<7} {r['splits']:<7} {r['unclassified']:<16} "
+              f"{r['prompt_tokens_per_citation']:<17} {r['completion_tokens_per_citation']:<20} %{r['accuracy'] * 100:.1f}")
+    if response_cache is not None:
+        response_cache.report()
+    return 0
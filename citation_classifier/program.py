@@ -0,0 +1,224 @@
+import json
+import threading
+
+import dspy
+from pydantic import BaseModel
+
+from .config import CITATION_CLASSES
+from .scheduler import exception_chain, is_retryable_error
+
+
+class CitationIntentSignature(dspy.Signature):
+    """
+    You are an expert academic editor specializing in computer science and artificial intelligence. Your task is to meticulously analyze and classify academic citations from Turkish research papers based on their rhetorical intent. The citations and their corresponding section titles will be provided in Turkish.
+    Your goal is to classify each citation into one of the following six categories. These categories are inspired by the Web of Science (WoS) citation classification schema (Clarivate) and have been refined with details from their guidelines for enhanced clarity:
+    1.  **background**:
+        * **Description**: The cited work is referred to for general context, historical information, or to acknowledge foundational studies that are **not directly built upon** by the current research. These citations help set the stage, place the current study within a broader scholarly conversation, or might acknowledge a method/software that is not central to the current paper's core work.
+        * **WoS Insight**: previously published research that orients the current study within a scholarly area.
+        * **Typical Turkish Sections**: 'Giriş' (Introduction), 'Literatür Taraması' (Literature Review), 'İlgili Çalışmalar' (Related Work), 'Genel Bilgiler' (General Information).
+        * **Key Idea**: Provides broader context or acknowledges foundational knowledge that is not a direct methodological pillar for the current study.
+
+    2.  **basis**:
+        * **Description**: The cited work provides a fundamental pillar for the current study. The current research **directly reports using or adapting the specific methods, algorithms, data sets, software, or equipment** described in the cited work for its own execution. These citations are central to how the research was designed and conducted. Studies usually rely on a relatively small number of such foundational works.
+        * **WoS Insight**: references that report the data sets, methods, concepts and ideas that the author is using for her work directly or on which the author bases her work
+        * **Typical Turkish Sections**: 'Yöntem' (Methodology), 'Materyal ve Metot' (Material and Method), 'Model Tasarımı' (Model Design), 'Veri Seti' (Dataset), 'Uygulama' (Implementation).
+        * **Key Idea**: The current study's methodology or execution directly and essentially depends on the content of the cited work.
+
+    3.  **discuss**:
+        * **Description**: The cited work is actively and substantively discussed, analyzed, or critically evaluated within the current study. This can involve a detailed examination of its specific arguments, findings, theories, contributions, strengths, or weaknesses. The discussion often relates the cited work's importance or relevance to the current research, or compares/contrasts its approach beyond a simple statement of similar/dissimilar results.
+        * **WoS Insight**: references mentioned because the current study is going into a more detailed discussion.
+        * **Typical Turkish Sections**: 'Literatür Taraması' (Literature Review), 'Tartışma' (Discussion), 'Bulgular ve Tartışma' (Results and Discussion), 'İlgili Çalışmalar' (Related Work).
+        * **Key Idea**: The cited work is a subject of significant intellectual engagement, analysis, or critique, not just a simple reference for support or difference of findings.
+
+    4.  **support**:
+        * **Description**: The findings, arguments, or **results reported in the cited work are directly compared with those of the current study and are presented as being consistent with, and thereby reinforcing or validating, the results, claims, or conclusions of the current (citing) study.** The current study uses the cited work to show that its own findings are corroborated. These citations are generally few in number per study.
+        * **WoS Insight**: references which the current study reports to have similar results to. This may also refer to similarities in methodology or in some cases replication of results.
+        * **Typical Turkish Sections**: 'Bulgular' (Results), 'Sonuçlar' (Results/Conclusion), 'Tartışma' (Discussion), 'Doğrulama' (Validation).
+        * **Key Idea**: The cited work's outcomes lend credibility and support to the current study's findings by demonstrating consistency.
+
+    5.  **differ**:
+        * **Description**: The findings, arguments, or **results reported in the cited work are directly compared with those of the current study and are presented as contrasting with, contradicting, or highlighting different perspectives or outcomes compared to those of the current (citing) study.** The current study uses the cited work to highlight how its own findings differ or offer an alternative view. These citations are also generally few in number per study.
+        * **WoS Insight**: references which the current study reports to have differing results to. This may also refer to differences in methodology or differences in sample sizes, affecting results.
+        * **Typical Turkish Sections**: 'Bulgular' (Results), 'Sonuçlar' (Results/Conclusion), 'Tartışma' (Discussion).
+        * **Key Idea**: The cited work's *results* are shown to diverge from, contradict, or present significantly different outcomes when compared to the current study's findings.
+
+    6.  **other**:
+        * **Description**: The citation's rhetorical intent cannot be confidently determined from the provided excerpt and context. This category **explicitly includes very short citation phrases (e.g., 3-4 Turkish words) that lack sufficient semantic content to convey a clear purpose**, incomplete citation references, or mentions that don't fit any other specific rhetorical function (e.g., a passing mention without clear intent).
+        * **WoS Insight**: Citations that are not classifiable into other specific categories.
+        * **Key Idea**: Insufficient information for classification, the citation is semantically too weak for intent analysis, or it serves a purely bibliographic purpose without clear rhetorical intent in the given context.
+
+    **Important Considerations for Classification**:
+    * **Language**: The `citation` text and `section` titles in the input JSON will be in **Turkish**. Your classification should be based on understanding this Turkish content.
+    * **Context is Key**: While the 'section' (Turkish section title) where the citation appears provides a strong contextual clue (typical Turkish section names are provided as hints for each category), the primary basis for classification should be the semantic content and rhetorical function of the 'citation' text itself. A citation's intent might occasionally differ from its section's typical use.
+    * **Zero-Shot Task**: This is a zero-shot classification task. Do not expect or use any pre-defined examples for learning within this prompt.
+
+    **Input Format**:
+    Each citation will be provided as a JSON object with the following fields:
+    * `id`: A unique identifier for the citation (String).
+    * `citation`: The citation sentence or excerpt **in Turkish** (String).
+    * `section`: The title of the section in which the citation appears, **in Turkish** (String).
+
+    All citations will be presented as a JSON array.
+    Example of Input Data Structure:
+    [
+      {
+        "id": "unique_id_1",
+        "citation": "Alanyazında bu konuda farklı yaklaşımlar mevcuttur (Yılmaz, 2020; Kaya, 2019).",
+        "section": "Giriş"
+      },
+      {
+        "id": "unique_id_2",
+        "citation": "Bu çalışmada, Demir ve ark. (2021) tarafından önerilen sinir ağı mimarisi temel alınmıştır.",
+        "section": "Yöntem"
+      }
+    ]
+
+    **Expected Output Format**:
+    The output must be a JSON array of objects. Each object should contain the `id` of the citation and its classified `intent`.
+    Example of Output Data Structure:
+    [
+      {
+        "id": "unique_id_1",
+        "intent": "background"
+      },
+      {
+        "id": "unique_id_2",
+        "intent": "basis"
+      }
+    ]
+
+    Please return your response strictly as a valid JSON array. Do not include any additional commentary, explanation, text, or formatting outside of the JSON array itself.
+   """
+    citation = dspy.InputField(desc="Citation Context")
+    section = dspy.InputField(desc="Citation Section Title")
+    intent = dspy.OutputField(desc="Please enter one of the following citation intent: 'background', 'basis', 'discuss', 'support', 'differ', 'other'")
+
+class ClassifyCitation(dspy.Module):
+    def __init__(self, demo_index=None, num_demos=4):
+        super().__init__()
+        self.citation_intent_signature = CitationIntentSignature
+        self.classifier = dspy.ChainOfThought(signature=CitationIntentSignature)
+        # demo_index verilirse sabit demolar yerine her sorgu için en benzer num_demos örnek gönderilir (retrieval.DemoIndex)
+        self.demo_index = demo_index
+        self.num_demos = num_demos
+    def forward(self, citation, section):
+        if self.demo_index is not None:
+            demos = self.demo_index.demos_for(citation, section, k=self.num_demos)
+            return self.classifier(citation=citation, section=section, demos=demos)
+        prediction = self.classifier(citation=citation, section=section)
+        return prediction
+
+
+class CitationIntentItem(BaseModel):
+    id: str
+    intent: str
+
+
+class PackedCitationIntentSignature(dspy.Signature):
+    citations: str = dspy.InputField(desc="JSON array of citations, each with 'id', 'citation' and 'section' fields")
+    intents: list[CitationIntentItem] = dspy.OutputField(desc="One object per input citation with its 'id' and 'intent' (one of: 'background', 'basis', 'discuss', 'support', 'differ', 'other')")
+
+
+# Birden çok atıfı tek istekte sınıflandırmak için aynı talimatlar kullanılır (talimatlar zaten JSON dizisi formatını tanımlar)
+PackedCitationIntentSignature = PackedCitationIntentSignature.with_instructions(CitationIntentSignature.instructions)
+
+
+class _CopyableLock:
+    """Modül kopyalanırken (MIPROv2, dspy deepcopy) her kopyaya yeni bir kilit veren threading.Lock sarmalayıcısı."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._lock.__exit__(*exc_info)
+
+    def __deepcopy__(self, memo):
+        return _CopyableLock()
+
+
+def is_parse_error(exc):
+    # Adaptör çıktıyı ayrıştıramadı veya alanlar doğrulanamadı (pydantic ValidationError da bir ValueError'dır)
+    from dspy.utils.exceptions import AdapterParseError
+
+    return any(isinstance(e, (AdapterParseError, ValueError)) for e in exception_chain(exc))
+
+
+class PackedClassifyCitation(dspy.Module):
+    """pack_size adet (atıf, bölüm) çiftini tek LM isteğinde sınıflandırır.
+
+    Dönen her etiket CITATION_CLASSES'a göre doğrulanır; çıktı bozuk veya eksikse paket bölünür ve
+    yalnızca cevapsız kalan atıflar yeniden denenir. Tek atıflık pakette de geçerli etiket alınamazsa
+    tahminin intent'i None, error alanı hata mesajıdır. Bölme yalnızca ayrıştırma/doğrulama hatalarında
+    yapılır: geçici LM hataları (429, 5xx, zaman aşımı) çağırana fırlatılır ki paket bütün olarak yeniden
+    denensin; diğer LM hatalarında paketin tamamı hatalı işaretlenir.
+    """
+
+    def __init__(self, pack_size=8):
+        super().__init__()
+        self.pack_size = pack_size
+        self.classifier = dspy.ChainOfThought(signature=PackedCitationIntentSignature)
+        self.requests = 0
+        self.splits = 0
+        # Aynı modül batch.py iş parçacıkları ve HTTP servisi tarafından eşzamanlı kullanılır
+        self._stats_lock = _CopyableLock()
+
+    def forward(self, citation, section):
+        # Tek atıflık arayüz (batch.run_batch ve dspy.Evaluate ile uyum için)
+        return self.forward_many([(citation, section)])[0]
+
+    def forward_many(self, items):
+        predictions = [None] * len(items)
+        for start in range(0, len(items), self.pack_size):
+            self._classify_pack(items, list(range(start, min(start + self.pack_size, len(items)))), predictions)
+        return predictions
+
+    def _classify_pack(self, items, indices, predictions):
+        payload = json.dumps(
+            [{"id": str(n), "citation": items[i][0], "section": items[i][1]} for n, i in enumerate(indices)],
+            ensure_ascii=False,
+        )
+        with self._stats_lock:
+            self.requests += 1
+        labels, reasoning, error = {}, None, "Geçersiz veya eksik etiket"
+        try:
+            result = self.classifier(citations=payload)
+            reasoning = getattr(result, "reasoning", None)
+            for item in result.intents or []:
+                intent = str(item.intent).strip().lower()
+                if item.id not in labels and intent in CITATION_CLASSES:
+                    labels[item.id] = intent
+        except Exception as e:
+            if is_retryable_error(e):
+                raise
+            error = f"{type(e).__name__}: {e}"
+            if not is_parse_error(e):
+                # Bölmek aynı hatayı daha çok istekle tekrarlar
+                for i in indices:
+                    predictions[i] = dspy.Prediction(intent=None, reasoning=None, error=error, pack_size=len(indices))
+                return
+            # Ayrıştırılamayan çıktı: aşağıda bölünerek yeniden denenir
+
+        missing = []
+        for n, i in enumerate(indices):
+            if str(n) in labels:
+                predictions[i] = dspy.Prediction(intent=labels[str(n)], reasoning=reasoning, pack_size=len(indices))
+            else:
+                missing.append(i)
+
+        if not missing:
+            return
+        if len(indices) == 1:
+            predictions[missing[0]] = dspy.Prediction(intent=None, reasoning=reasoning, error=error, pack_size=1)
+            return
+        with self._stats_lock:
+            self.splits += 1
+        if len(missing) == len(indices):
+            # Tamamen başarısız paket aynı boyutta tekrar denenmez, ikiye bölünür
+            half = len(missing) // 2
+            self._classify_pack(items, missing[:half], predictions)
+            self._classify_pack(items, missing[half:], predictions)
+        else:
+            self._classify_pack(items, missing, predictions)
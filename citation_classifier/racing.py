@@ -0,0 +1,108 @@
+import math
+import random
+
+# Aday programların valset üzerinde yarıştırılması (racing): tam valset değerlendirmesi sabit, rastgele bir sırayla
+# büyüyen parçalar hâlinde yapılır. Her parçadan sonra adayın tam valset skoru için üst güven sınırı hesaplanır;
+# sınır mevcut en iyinin (incumbent) skorunu geçemiyorsa aday elenir ve kalan örnekler için LM çağrısı yapılmaz.
+# Üst sınır, sonlu popülasyon (Serfling) Hoeffding sınırı ile kalan örneklerin tamamının doğru olduğu deterministik
+# sınırın küçüğüdür; metrik 0/1 döndürdüğü için skorlar [0, 1] aralığındadır.
+
+DEFAULT_DELTA = 0.05
+DEFAULT_MIN_BATCH = 20
+DEFAULT_GROWTH = 2.0
+
+
+def batch_boundaries(total, min_batch=DEFAULT_MIN_BATCH, growth=DEFAULT_GROWTH):
+    """Değerlendirilen örnek sayısının kontrol noktaları (ör. 20, 60, 140, ..., total)."""
+    boundaries, evaluated, batch = [], 0, min_batch
+    while evaluated < total:
+        evaluated = min(total, evaluated + batch)
+        boundaries.append(evaluated)
+        batch = max(1, int(batch * growth))
+    return boundaries
+
+
+def upper_confidence_bound(correct, evaluated, total, delta):
+    mean = correct / evaluated
+    margin = math.sqrt((1 - (evaluated - 1) / total) * math.log(1 / delta) / (2 * evaluated))
+    best_case = (correct + total - evaluated) / total
+    return min(mean + margin, best_case)
+
+
+class RacingEvaluator:
+    """evaluate_fn(program, examples) -> (skor, örnek_skorları) fonksiyonunu yarış mantığıyla çağırır."""
+
+    def __init__(self, delta=DEFAULT_DELTA, min_batch=DEFAULT_MIN_BATCH, growth=DEFAULT_GROWTH, seed=0):
+        self.delta = delta
+        self.min_batch = min_batch
+        self.growth = growth
+        self.seed = seed
+        self.races = 0
+        self.pruned = 0
+        self.examples_evaluated = 0
+        self.examples_exhaustive = 0
+        self.lm_calls_evaluated = 0
+        self.lm_calls_exhaustive = 0
+        self.pruned_candidates = []
+
+    def __call__(self, evaluate_fn, program, devset, incumbent):
+        total = len(devset)
+        # Tüm adaylar aynı sırayla değerlendirilir; erken parçalardaki karşılaştırmalar eşleştirilmiş olur
+        order = random.Random(self.seed).sample(range(total), total)
+        boundaries = batch_boundaries(total, self.min_batch, self.growth)
+        # Her kontrol noktası ayrı bir test; toplam hata olasılığı delta ile sınırlı kalsın diye bölünür
+        delta_per_look = self.delta / max(1, len(boundaries) - 1)
+
+        scores = [None] * total
+        correct, evaluated, pruned = 0.0, 0, False
+        for boundary in boundaries:
+            indices = order[evaluated:boundary]
+            _, chunk_scores = evaluate_fn(program, [devset[i] for i in indices])
+            for i, score in zip(indices, chunk_scores):
+                scores[i] = score
+                correct += float(score)
+            evaluated = boundary
+            if evaluated < total and incumbent is not None:
+                bound = upper_confidence_bound(correct, evaluated, total, delta_per_look)
+                if 100 * bound <= incumbent:
+                    pruned = True
+                    break
+
+        lm_calls_per_example = max(1, len(program.predictors()))
+        self.races += 1
+        self.examples_evaluated += evaluated
+        self.examples_exhaustive += total
+        self.lm_calls_evaluated += evaluated * lm_calls_per_example
+        self.lm_calls_exhaustive += total * lm_calls_per_example
+        if pruned:
+            self.pruned += 1
+            self.pruned_candidates.append((program.deepcopy(), devset, scores))
+            # Elenen adayın skoru, değerlendirilen örneklerin ortalamasıdır (üst sınırdan, dolayısıyla incumbent'tan küçük)
+            return round(100 * correct / evaluated, 2), scores, evaluated
+        return round(100 * correct / total, 2), scores, evaluated
+
+    def lm_calls_saved(self):
+        return self.lm_calls_exhaustive - self.lm_calls_evaluated
+
+    def verify(self, evaluate_fn, selected_score):
+        """Elenen adayları tam valset üzerinde tamamlar; hiçbiri seçilen programı geçmiyorsa seçim tam değerlendirmeyle aynıdır."""
+        best_pruned = None
+        for program, devset, scores in self.pruned_candidates:
+            missing = [i for i, score in enumerate(scores) if score is None]
+            _, missing_scores = evaluate_fn(program, [devset[i] for i in missing])
+            full = list(scores)
+            for i, score in zip(missing, missing_scores):
+                full[i] = score
+            full_score = round(100 * sum(float(s) for s in full) / len(full), 2)
+            best_pruned = full_score if best_pruned is None else max(best_pruned, full_score)
+        exhaustive_best = selected_score if best_pruned is None else max(selected_score, best_pruned)
+        return exhaustive_best, best_pruned
+
+    def report(self):
+        print("Yarış (erken eleme) raporu:")
+        print(f"  Tam valset değerlendirmesi: {self.races}, erken elenen aday: {self.pruned}")
+        print(f"  Değerlendirilen örnek: {self.examples_evaluated} / {self.examples_exhaustive}")
+        saved = self.lm_calls_saved()
+        ratio = saved / self.lm_calls_exhaustive * 100 if self.lm_calls_exhaustive else 0.0
+        print(f"  LM çağrısı: {self.lm_calls_evaluated} (tam değerlendirmeyle {self.lm_calls_exhaustive}), "
+              f"tasarruf: {saved} (%{ratio:.1f})")
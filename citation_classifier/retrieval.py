@@ -0,0 +1,206 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+
+from .config import CSV_TRAIN_PATH
+
+# Sorgu başına dinamik demo seçimi: trainset.csv üzerinde, hash'lenmiş karakter n-gram vektörlerinden oluşan
+# yerel bir en yakın komşu indeksi. Vektörler (NumPy matrisi) program JSON dosyasının yanına .npy olarak
+# kaydedilir ve yüklenirken bellek eşlemeli (mmap) açılır; her çağrıda sabit demo listesi yerine en benzer k örnek gönderilir.
+
+DEFAULT_DIM = 2048
+DEFAULT_NGRAM_RANGE = (3, 5)
+SECTION_WEIGHT = 0.5
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    text = str(text).replace("İ", "i").replace("I", "ı").lower()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+# Programda derlenmiş demo yoksa kullanılacak k
+DEFAULT_RETRIEVAL_K = 4
+
+
+def add_retrieval_argument(parser):
+    parser.add_argument("--retrieval-k", type=int, nargs="?", const=0,
+                        help="Sabit demolar yerine trainset'ten sorguya en benzer k örneği demo olarak kullan "
+                             "(değer verilmezse k, derlenmiş programdaki demo sayısıdır; prompt uzamaz)")
+    return parser
+
+
+def resolve_retrieval_k(requested, compiled_demos):
+    """--retrieval-k değerini çözer: 0 (değersiz bayrak) derlenmiş demo sayısı demektir."""
+    if requested is None or requested > 0:
+        if requested and compiled_demos and requested > compiled_demos:
+            print(f"Uyarı: k={requested}, derlenmiş programdaki {compiled_demos} demodan fazla; "
+                  f"prompt'lar sabit demolara göre uzayacak.")
+        return requested
+    return compiled_demos or DEFAULT_RETRIEVAL_K
+
+
+def demo_index_paths(program_path):
+    base, _ = os.path.splitext(program_path)
+    return base + ".demo_index.npy", base + ".demo_index.json"
+
+
+class HashedNgramVectorizer:
+    def __init__(self, dim=DEFAULT_DIM, ngram_range=DEFAULT_NGRAM_RANGE):
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+
+    def _add_ngrams(self, vector, text, weight):
+        text = f" {normalize_text(text)} "
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(text) - n + 1):
+                # Python'un hash()'i süreçler arası değişir; indeks diske yazıldığı için kararlı crc32 kullanılır
+                vector[zlib.crc32(text[i:i + n].encode("utf-8")) % self.dim] += weight
+
+    def transform_one(self, citation, section):
+        import numpy as np
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        self._add_ngrams(vector, citation, 1.0)
+        self._add_ngrams(vector, section, SECTION_WEIGHT)
+        return np.log1p(vector, out=vector)
+
+
+class DemoIndex:
+    def __init__(self, matrix, idf, rows, vectorizer, reasoning_fingerprint=None):
+        self.matrix = matrix
+        self.idf = idf
+        self.rows = rows
+        self.vectorizer = vectorizer
+        # Gerekçelerin alındığı derlenmiş program demolarının özeti; yeniden optimize edilince indeks yenilenir
+        self.reasoning_fingerprint = reasoning_fingerprint
+
+    def __deepcopy__(self, memo):
+        # Salt okunur; MIPROv2 programı kopyaladığında indeks paylaşılır
+        return self
+
+    @classmethod
+    def build(cls, csv_path=CSV_TRAIN_PATH, program_path=None, dim=DEFAULT_DIM, ngram_range=DEFAULT_NGRAM_RANGE):
+        import numpy as np
+
+        vectorizer = HashedNgramVectorizer(dim, ngram_range)
+        reasoning_by_citation = _load_demo_reasoning(program_path) if program_path else {}
+        rows = []
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                rows.append({
+                    "citation": row["citation_context"],
+                    "section": row["section"],
+                    "intent": row["citation_intent"].strip().lower(),
+                    "reasoning": reasoning_by_citation.get(row["citation_context"].strip()),
+                })
+
+        matrix = np.vstack([vectorizer.transform_one(r["citation"], r["section"]) for r in rows])
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        idf = np.log((1 + len(rows)) / (1 + document_frequency)).astype(np.float32) + 1.0
+        matrix *= idf
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return cls(matrix, idf, rows, vectorizer, _reasoning_fingerprint(reasoning_by_citation))
+
+    def save(self, program_path):
+        import numpy as np
+
+        matrix_path, meta_path = demo_index_paths(program_path)
+        np.save(matrix_path, self.matrix)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.vectorizer.dim,
+                "ngram_range": list(self.vectorizer.ngram_range),
+                "idf": self.idf.tolist(),
+                "reasoning_fingerprint": self.reasoning_fingerprint,
+                "rows": self.rows,
+            }, f, ensure_ascii=False)
+        print(f"Demo indeksi '{matrix_path}' dosyasına kaydedildi ({len(self.rows)} örnek).")
+
+    @classmethod
+    def load(cls, program_path):
+        import numpy as np
+
+        matrix_path, meta_path = demo_index_paths(program_path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode="r")
+        vectorizer = HashedNgramVectorizer(meta["dim"], meta["ngram_range"])
+        return cls(matrix, np.asarray(meta["idf"], dtype=np.float32), meta["rows"], vectorizer,
+                   meta.get("reasoning_fingerprint"))
+
+    def search(self, citation, section, k=4, max_per_class=None):
+        import numpy as np
+
+        query = self.vectorizer.transform_one(citation, section) * self.idf
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.matrix @ query
+
+        # Tek bir sınıf (çoğunlukla 'background') tüm demoları doldurmasın
+        max_per_class = max_per_class or math.ceil(k / 2)
+        pool = min(len(scores), k * 8)
+        candidates = np.argpartition(-scores, pool - 1)[:pool]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        selected, per_class = [], {}
+        for i in candidates:
+            row = self.rows[int(i)]
+            # Sorgunun kendisi (ör. trainset üzerinde değerlendirme) demo olarak gönderilmez
+            if row["citation"] == citation and row["section"] == section:
+                continue
+            if per_class.get(row["intent"], 0) >= max_per_class:
+                continue
+            per_class[row["intent"]] = per_class.get(row["intent"], 0) + 1
+            selected.append(row)
+            if len(selected) == k:
+                break
+        return selected
+
+    def demos_for(self, citation, section, k=4):
+        import dspy
+
+        demos = []
+        for row in self.search(citation, section, k):
+            fields = {"citation": row["citation"], "section": row["section"], "intent": row["intent"]}
+            if row.get("reasoning"):
+                fields["reasoning"] = row["reasoning"]
+            demos.append(dspy.Example(**fields))
+        return demos
+
+
+def _load_demo_reasoning(program_path):
+    # Derlenmiş programdaki 'augmented' demoların gerekçeleri, aynı atıf seçilirse yeniden kullanılır
+    if not os.path.exists(program_path):
+        return {}
+    with open(program_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    demos = state.get("classifier.predict", {}).get("demos", [])
+    return {d["citation"].strip(): d["reasoning"] for d in demos if d.get("citation") and d.get("reasoning")}
+
+
+def _reasoning_fingerprint(reasoning_by_citation):
+    payload = json.dumps(reasoning_by_citation, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_or_build_demo_index(program_path, train_csv=CSV_TRAIN_PATH, rebuild=False):
+    """İndeks trainset'ten eskiyse veya program demolarının gerekçeleri değiştiyse (yeniden optimize) yeniden kurulur."""
+    matrix_path, meta_path = demo_index_paths(program_path)
+    fresh = (
+        os.path.exists(matrix_path) and os.path.exists(meta_path)
+        and os.path.getmtime(meta_path) >= os.path.getmtime(train_csv)
+    )
+    if fresh and not rebuild:
+        index = DemoIndex.load(program_path)
+        if index.reasoning_fingerprint == _reasoning_fingerprint(_load_demo_reasoning(program_path)):
+            return index
+        print("Program demoları değişmiş; demo indeksi yeniden oluşturuluyor.")
+    index = DemoIndex.build(train_csv, program_path=program_path)
+    index.save(program_path)
+    # Kaydedilen dosya mmap ile yeniden açılır, böylece worker'lar aynı sayfaları paylaşır
+    return DemoIndex.load(program_path)
@@ -0,0 +1,209 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Sağlayıcı kotalarına uyan asyncio tabanlı LM çağrı planlayıcısı:
+#   * model başına dakikalık istek (RPM) ve token (TPM) bütçeleri için token bucket,
+#   * 429 / geçici hatalarda jitter'lı üstel geri çekilme (backoff) ile yeniden deneme,
+#   * gözlenen gecikme ve hata oranına göre büyüyüp küçülen eşzamanlılık sınırı (AIMD).
+# Çağrılan fonksiyon senkron olabilir (ör. ClassifyCitation.forward); iş parçacığı havuzunda çalıştırılır.
+
+# Tier-1 kotalar için varsayılanlar (RPM, TPM); kendi kotanıza göre --rpm/--tpm ile değiştirin
+MODEL_RATE_LIMITS = {
+    "gemini/gemini-2.5-flash-preview-05-20": (1000, 1_000_000),
+    "openai/gpt-4o-mini": (500, 200_000),
+    "openai/gpt-4o": (500, 30_000),
+}
+DEFAULT_RATE_LIMITS = (60, 100_000)
+
+# Signature talimatları + demolar için yaklaşık sabit prompt maliyeti (token)
+DEFAULT_PROMPT_OVERHEAD_TOKENS = 3000
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "Timeout", "APITimeoutError", "APIConnectionError",
+    "ServiceUnavailableError", "InternalServerError",
+}
+
+
+def rate_limits_for(model):
+    return MODEL_RATE_LIMITS.get(model, DEFAULT_RATE_LIMITS)
+
+
+def exception_chain(exc):
+    # dspy/litellm hataları sarmalayabilir; durum kodu zincirdeki herhangi bir istisnada olabilir
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def is_rate_limit_error(exc):
+    return any(getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError"
+               for e in exception_chain(exc))
+
+
+def is_retryable_error(exc):
+    return any(getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES or type(e).__name__ in RETRYABLE_ERROR_NAMES
+               for e in exception_chain(exc))
+
+
+def estimate_request_tokens(kwargs, overhead_tokens=DEFAULT_PROMPT_OVERHEAD_TOKENS):
+    # Kaba tahmin: ~4 karakter = 1 token
+    chars = sum(len(str(v)) for v in kwargs.values())
+    return overhead_tokens + chars // 4
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount=1):
+        # Kovadan büyük istekler sonsuza kadar beklemesin
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def drain(self):
+        # Sağlayıcı 429 döndürdüğünde yerel bütçe de sıfırlanır, böylece tüm bekleyenler yavaşlar
+        self._refill()
+        self.tokens = 0
+
+
+class AdaptiveConcurrency:
+    def __init__(self, initial=4, minimum=1, maximum=64, latency_tolerance=2.0, decrease_factor=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.ewma_latency = None
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self, latency=None, failed=False):
+        async with self._condition:
+            self.in_flight -= 1
+            if failed:
+                self._decrease(self.decrease_factor)
+            elif latency is not None:
+                self._on_success(latency)
+            self._condition.notify_all()
+
+    def _on_success(self, latency):
+        self.ewma_latency = latency if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * latency
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        if self.ewma_latency > self.latency_tolerance * self.baseline_latency:
+            # Sağlayıcı tarafında kuyruklanma: hafifçe geri çekil
+            self._decrease(0.9)
+        else:
+            # Additive increase: her tam pencere başarıda sınır ~1 artar
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        # Aynı tıkanıklık olayında art arda gelen hatalar sınırı sıfıra indirmesin
+        if self.ewma_latency is not None and now - self._last_decrease < self.ewma_latency:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+
+class RateLimitedScheduler:
+    def __init__(self, call_fn, requests_per_minute, tokens_per_minute=None, initial_concurrency=4,
+                 max_concurrency=64, max_retries=6, base_delay=1.0, max_delay=60.0,
+                 token_estimator=estimate_request_tokens):
+        self.call_fn = call_fn
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.token_estimator = token_estimator
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        self._started = time.perf_counter()
+
+    @classmethod
+    def for_model(cls, call_fn, model, requests_per_minute=None, tokens_per_minute=None, **kwargs):
+        default_rpm, default_tpm = rate_limits_for(model)
+        return cls(call_fn, requests_per_minute or default_rpm, tokens_per_minute or default_tpm, **kwargs)
+
+    def backoff_delay(self, attempt, exc=None):
+        retry_after = next((e.retry_after for e in exception_chain(exc) if getattr(e, "retry_after", None)), None)
+        if retry_after:
+            return float(retry_after) + random.uniform(0, self.base_delay)
+        # Full jitter: aynı anda 429 alan istekler aynı anda tekrar denemesin
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def submit(self, **kwargs):
+        loop = asyncio.get_running_loop()
+        estimated_tokens = self.token_estimator(kwargs)
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire(estimated_tokens)
+            await self.concurrency.acquire()
+            self.stats["calls"] += 1
+            start = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self.executor, lambda: self.call_fn(**kwargs))
+            except Exception as e:
+                await self.concurrency.release(failed=is_retryable_error(e))
+                if not is_retryable_error(e) or attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    raise
+                if is_rate_limit_error(e):
+                    self.stats["rate_limited"] += 1
+                    self.request_bucket.drain()
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff_delay(attempt, e))
+                continue
+            await self.concurrency.release(latency=time.perf_counter() - start)
+            self.stats["succeeded"] += 1
+            return result
+
+    def summary(self):
+        elapsed = time.perf_counter() - self._started
+        return {
+            **self.stats,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "ewma_latency_s": round(self.concurrency.ewma_latency or 0.0, 4),
+            "throughput_per_s": round(self.stats["succeeded"] / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        s = self.summary()
+        print(f"Planlayıcı: {s['succeeded']} başarılı, {s['failed']} başarısız, {s['retries']} yeniden deneme "
+              f"({s['rate_limited']} adet 429), son eşzamanlılık sınırı {s['concurrency_limit']}, "
+              f"verim {s['throughput_per_s']} istek/sn")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,51 @@
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+
+from .config import save_path
+from .retrieval import add_retrieval_argument
+
+# Satır tabanlı worker: programı bir kez yükler, stdin'den gelen her JSON satırını
+# ({"citation": ..., "section": ..., "id": ...}) sınıflandırıp sonucu stdout'a tek satır JSON olarak yazar.
+
+
+def add_arguments(parser):
+    parser.add_argument("--program", default=save_path, help="Yüklenecek optimize edilmiş program dosyası")
+    add_retrieval_argument(parser)
+    return parser
+
+
+def handle_line(program, line):
+    start = time.perf_counter()
+    try:
+        request = json.loads(line)
+        prediction = program.forward(citation=request["citation"], section=request.get("section", ""))
+        response = {"id": request.get("id"), "intent": str(getattr(prediction, "intent", "")).strip().lower(),
+                    "status": "ok"}
+    except Exception as e:
+        response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    response["latency_s"] = round(time.perf_counter() - start, 4)
+    return response
+
+
+def run(args):
+    from .lm import build_lm
+    from .optimize import load_program
+
+    # Tanılama mesajları stdout'taki JSON akışını bozmasın
+    with redirect_stdout(sys.stderr):
+        _, response_cache = build_lm(args)
+        program = load_program(args.program, retrieval_k=args.retrieval_k)
+        print("Worker hazır, stdin'den istek bekleniyor.")
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        sys.stdout.write(json.dumps(handle_line(program, line), ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    if response_cache is not None:
+        with redirect_stdout(sys.stderr):
+            response_cache.report()
+    return 0
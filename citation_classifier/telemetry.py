@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from dspy.utils.callback import BaseCallback
+
+from .analyze import MiproLogParser
+
+# LM çağrısı başına yapılandırılmış telemetri. Her çağrı için telemetri JSONL dosyasına bir satır yazılır:
+#   event="lm_call", ts, stage (bootstrap / propose / trial / eval / inference), trial, model, latency_s, prompt_tokens,
+#   completion_tokens, cost, cache_hit, retries, status, error, intent, pid
+# Aşama bilgisi optimizasyon sırasında MIPROv2'nin log mesajlarından (analyze.MiproLogParser) çıkarılır ve deneme
+# skorları event="score" satırları olarak aynı dosyaya yazılır; aynı ayrıştırıcı eski DSPy_Log_* metin loglarını
+# geriye dönük işlemek için de kullanılır.
+
+_CHAT_INTENT = re.compile(r"\[\[ ## intent ## \]\]\s*([^\n\[]+)")
+_CHAT_INTENTS = re.compile(r"\[\[ ## intents ## \]\]\s*(\[.*?\])\s*(?:\[\[ ##|$)", re.DOTALL)
+
+_stage = {"stage": "inference", "trial": None}
+_stage_lock = threading.Lock()
+
+
+def set_stage(stage, trial=None):
+    with _stage_lock:
+        _stage["stage"] = stage
+        _stage["trial"] = trial
+
+
+def current_stage():
+    with _stage_lock:
+        return dict(_stage)
+
+
+class MiproStageHandler(logging.Handler):
+    """dspy log kayıtlarından o anki optimizasyon aşamasını (set_stage) günceller; deneme skorlarını telemetriye yazar."""
+
+    def __init__(self, recorder):
+        super().__init__(logging.INFO)
+        self.recorder = recorder
+        self.parser = MiproLogParser()
+
+    def emit(self, record):
+        try:
+            for event in self.parser.feed(f"{record.name}: {record.getMessage()}"):
+                if event["event"] == "stage":
+                    set_stage(event["stage"], event.get("trial"))
+                elif event["event"] in ("score", "eval"):
+                    event.pop("timestamp", None)
+                    self.recorder.write({"event": event.pop("event"), "ts": round(time.time(), 3), **event})
+        except Exception:
+            self.handleError(record)
+
+
+def parse_intent(output):
+    text = output.get("text", "") if isinstance(output, dict) else str(output)
+    match = _CHAT_INTENT.search(text)
+    if match:
+        return match.group(1).strip()
+    match = _CHAT_INTENTS.search(text)
+    try:
+        data = json.loads(match.group(1) if match else text)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(data, list):
+        # Paketlenmiş imza: [{"id", "intent"}, ...]
+        return [item.get("intent") for item in data if isinstance(item, dict)]
+    if isinstance(data, dict):
+        if "intent" in data:
+            return data["intent"]
+        if isinstance(data.get("intents"), list):
+            return [item.get("intent") for item in data["intents"] if isinstance(item, dict)]
+    return None
+
+
+class TelemetryRecorder(BaseCallback):
+    """dspy callback'i olarak her LM çağrısını JSONL telemetri dosyasına yazar."""
+
+    # Eşleşen geçmiş kaydı bulunurken geriye doğru en fazla bu kadar kayda bakılır
+    HISTORY_LOOKBACK = 256
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def on_lm_start(self, call_id, instance, inputs):
+        with self._lock:
+            self._pending[call_id] = (time.perf_counter(), instance, inputs.get("messages"), inputs.get("prompt"),
+                                      current_stage())
+
+    def on_lm_end(self, call_id, outputs, exception=None):
+        with self._lock:
+            pending = self._pending.pop(call_id, None)
+        if pending is None:
+            return
+        started, instance, messages, prompt, stage = pending
+        record = {
+            "event": "lm_call",
+            "ts": round(time.time(), 3),
+            "stage": stage["stage"],
+            "trial": stage["trial"],
+            "model": getattr(instance, "model", None),
+            "latency_s": round(time.perf_counter() - started, 4),
+            "prompt_tokens": None,
+            "completion_tokens": None,
+            "cost": None,
+            "cache_hit": False,
+            "retries": 0,
+            "status": "error" if exception is not None else "ok",
+            "error": f"{type(exception).__name__}: {exception}" if exception is not None else None,
+            "intent": parse_intent(outputs[0]) if outputs else None,
+            "pid": os.getpid(),
+        }
+        entry = self._find_history_entry(instance, messages, prompt) if exception is None else None
+        if entry is not None:
+            usage = entry.get("usage") or {}
+            hidden = getattr(entry.get("response"), "_hidden_params", None) or {}
+            headers = hidden.get("additional_headers") or {}
+            record.update({
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "cost": entry.get("cost"),
+                "cache_hit": bool(hidden.get("cache_hit")),
+                "retries": int(headers.get("x-litellm-attempted-retries") or 0),
+            })
+        self.write(record)
+
+    def _find_history_entry(self, instance, messages, prompt):
+        # Aynı LM'i birden fazla thread kullanabildiği için son kayıt değil, aynı mesaj nesnesine ait kayıt aranır
+        history = getattr(instance, "history", None) or []
+        for entry in reversed(history[-self.HISTORY_LOOKBACK:]):
+            if messages is not None and entry.get("messages") is messages:
+                return entry
+            if messages is None and prompt is not None and entry.get("prompt") is prompt:
+                return entry
+        return None
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def install_telemetry(path):
+    """Telemetri kaydediciyi dspy'a callback olarak ekler ve MIPROv2 loglarından aşama takibini başlatır."""
+    import dspy
+
+    recorder = TelemetryRecorder(path)
+    dspy.configure(callbacks=[*dspy.settings.get("callbacks", []), recorder])
+    logging.getLogger("dspy").addHandler(MiproStageHandler(recorder))
+    print(f"LM telemetrisi '{path}' dosyasına yazılıyor.")
+    return recorder
@@ -0,0 +1,4 @@
+import os
+
+# litellm içe aktarılırken model fiyat tablosunu ağdan indirmeye çalışmasın (testler çevrimdışı çalışır)
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
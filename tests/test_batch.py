@@ -0,0 +1,31 @@
+import csv
+import json
+
+import dspy
+
+from citation_classifier.batch import run_batch
+from citation_classifier.fake_lm import FakeLM
+from citation_classifier.program import ClassifyCitation
+
+
+def test_resume_retries_error_records_and_replaces_them(tmp_path):
+    input_csv = tmp_path / "input.csv"
+    with open(input_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["citation_id", "citation_context", "section"])
+        writer.writerows([str(i), f"Bu yöntem daha önce önerilmiştir [{i}] .", "Giriş"] for i in range(20))
+    output = tmp_path / "out.jsonl"
+    program = ClassifyCitation()
+
+    dspy.configure(lm=FakeLM(error_rate=0.5, seed=3))
+    first = run_batch(program, str(input_csv), str(output), workers=4, log_every=0)
+    assert first["error"] > 0
+
+    dspy.configure(lm=FakeLM())
+    second = run_batch(program, str(input_csv), str(output), workers=4, log_every=0)
+    assert second["skipped"] == first["ok"]
+    assert second["ok"] == first["error"]
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(record["key"] for record in records) == sorted(str(i) for i in range(20))
+    assert all(record["status"] == "ok" for record in records)
@@ -0,0 +1,39 @@
+from citation_classifier.cache import LMResponseCache, make_cache_key
+
+MESSAGES = [{"role": "user", "content": "Bu atıfı sınıflandır"}]
+
+
+def test_cache_key_ignores_transport_params():
+    base = make_cache_key("openai/gpt-4o-mini", MESSAGES, {"temperature": 0.0})
+    assert make_cache_key("openai/gpt-4o-mini", MESSAGES,
+                          {"temperature": 0.0, "cache_in_memory": False, "num_retries": 8, "timeout": 30}) == base
+    assert make_cache_key("openai/gpt-4o-mini", MESSAGES, {"temperature": 0.7}) != base
+
+
+def test_size_bound_holds_across_connections_sharing_a_file(tmp_path):
+    path = str(tmp_path / "lm_cache.sqlite")
+    # İki bağlantı, aynı dosyayı paylaşan iki süreci temsil eder
+    first, second = LMResponseCache(path, max_bytes=20_000), LMResponseCache(path, max_bytes=20_000)
+    try:
+        for i in range(40):
+            (first if i % 2 else second).put(f"key-{i}", "x" * 1000)
+        assert first.size_bytes() <= 20_000
+        assert second.size_bytes() <= 20_000
+        assert first.evictions + second.evictions > 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_hits_do_not_write_until_flushed(tmp_path):
+    path = str(tmp_path / "lm_cache.sqlite")
+    cache = LMResponseCache(path)
+    try:
+        cache.put("key", {"answer": 1})
+        before = cache._conn.execute("SELECT last_access FROM entries WHERE key = 'key'").fetchone()[0]
+        assert cache.get("key") == {"answer": 1}
+        assert cache._conn.execute("SELECT last_access FROM entries WHERE key = 'key'").fetchone()[0] == before
+        cache.flush()
+        assert cache._conn.execute("SELECT last_access FROM entries WHERE key = 'key'").fetchone()[0] > before
+    finally:
+        cache.close()
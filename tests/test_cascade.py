@@ -0,0 +1,42 @@
+import csv
+
+import dspy
+
+from citation_classifier.cascade import CascadeClassifier, train_preclassifier
+
+
+class EchoProgram:
+    def forward(self, citation, section):
+        return dspy.Prediction(intent="llm")
+
+    def forward_many(self, items):
+        return [dspy.Prediction(intent="llm") for _ in items]
+
+
+def write_rows(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["citation_intent", "citation_context", "section"])
+        writer.writerows(rows)
+
+
+def test_local_answers_confusable_with_excluded_classes_are_deferred(tmp_path):
+    rows = [("background", f"Bu alan uzun süredir çalışılmaktadır ve birçok yöntem önerilmiştir {i}.", "Giriş")
+            for i in range(12)]
+    rows += [("basis", f"Bu çalışmada önerilen algoritma veri kümesine uygulanmıştır {i}.", "Yöntem") for i in range(12)]
+    rows += [("differ", "Bu alan uzun süredir çalışılmaktadır ancak sonuçlarımız farklıdır.", "Giriş")]
+    train_csv = tmp_path / "train.csv"
+    write_rows(train_csv, rows)
+
+    model = train_preclassifier(str(train_csv))
+    assert model.excluded_classes_ == ["differ"]
+    assert model.confusable_classes_ == ["background"]
+
+    cascade = CascadeClassifier(model, EchoProgram(), threshold=0.0)
+    items = [("Bu alan uzun süredir çalışılmaktadır ve birçok yöntem önerilmiştir.", "Giriş"),
+             ("Bu çalışmada önerilen algoritma veri kümesine uygulanmıştır.", "Yöntem")]
+    predictions = cascade.forward_many(items)
+    assert [p.route for p in predictions] == ["llm", "local"]
+    assert predictions[1].intent == "basis"
+    assert cascade.guarded_calls == 1
+    assert cascade.forward(*items[0]).route == "llm"
@@ -0,0 +1,69 @@
+import csv
+import os
+
+from citation_classifier import data
+from citation_classifier.data import CURRENT_POINTER, build_columnar_cache, columnar_cache_dir, load_columnar_dataset
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["citation_intent", "citation_context", "section"])
+        writer.writerows(rows)
+
+
+def test_rebuild_swaps_pointer_and_keeps_open_dataset_readable(tmp_path):
+    train_csv = str(tmp_path / "train.csv")
+    write_csv(train_csv, [["background", "Önceki çalışma [1] .", "Giriş"], ["basis", "Uygulanan yöntem [2] .", "Yöntem"]])
+    cache_dir = columnar_cache_dir(train_csv)
+
+    first = load_columnar_dataset(train_csv)
+    first_version = open(os.path.join(cache_dir, CURRENT_POINTER), encoding="utf-8").read()
+    assert first.value("citation_context", 1) == "Uygulanan yöntem [2] ."
+
+    second_dir = build_columnar_cache(train_csv)
+    assert os.path.basename(second_dir) != first_version
+    assert sorted(os.listdir(cache_dir)) == sorted([CURRENT_POINTER, data.LOCK_FILE, os.path.basename(second_dir)])
+    # Eski sürümü mmap ile açmış okuyucu, klasör silinse de okumaya devam eder
+    assert first.value("section", 0) == "Giriş"
+
+    data._open_datasets.clear()
+    assert load_columnar_dataset(train_csv).class_counts() == {"background": 1, "basis": 1}
+
+
+def test_loader_retries_when_version_disappears_after_pointer_read(tmp_path, monkeypatch):
+    train_csv = str(tmp_path / "train.csv")
+    write_csv(train_csv, [["background", "Önceki çalışma [1] .", "Giriş"]])
+    build_columnar_cache(train_csv)
+    data._open_datasets.clear()
+
+    real_open = data.ColumnarDataset.open.__func__
+    calls = []
+
+    def flaky_open(cls, version_dir):
+        calls.append(version_dir)
+        if len(calls) == 1:
+            # Başka bir süreç arada yeni sürüm yazıp eskisini silmiş gibi
+            build_columnar_cache(train_csv)
+        return real_open(cls, version_dir)
+
+    monkeypatch.setattr(data.ColumnarDataset, "open", classmethod(flaky_open))
+    dataset = load_columnar_dataset(train_csv)
+    assert len(calls) == 2 and calls[0] != calls[1]
+    assert dataset.value("citation_intent", 0) == "background"
+
+
+def test_balanced_sampling_matches_previous_pandas_selection(tmp_path):
+    import pandas as pd
+
+    train_csv = str(tmp_path / "train.csv")
+    classes = ["background", "basis", "support"]
+    write_csv(train_csv, [[classes[(i * 7) % 3], f"Atıf {i} [{i}] .", f"Bölüm {i % 4}"] for i in range(60)])
+    train_df = pd.read_csv(train_csv)
+
+    dataset = load_columnar_dataset(train_csv)
+    for seed in (0, 42, 1234):
+        expected = pd.concat([train_df[train_df["citation_intent"] == cls].sample(n=5, random_state=seed)
+                              for cls in classes])
+        indices = dataset.balanced_indices(classes, 5, random_state=seed)
+        assert [dataset.value("citation_context", int(i)) for i in indices] == expected["citation_context"].tolist()
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+import dspy
+
+from citation_classifier.dedup import DedupClassifier, NearDuplicateIndex
+from citation_classifier.fake_lm import FakeLM
+from citation_classifier.program import ClassifyCitation, PackedClassifyCitation
+
+CITATION = "Derin öğrenme yöntemleri görüntü sınıflandırmada başarılı sonuçlar vermiştir [{}] ."
+
+
+def test_concurrent_near_duplicates_wait_for_the_in_flight_answer():
+    dspy.configure(lm=FakeLM(latency_s=0.2))
+    classifier = DedupClassifier(NearDuplicateIndex(threshold=0.85), ClassifyCitation())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        predictions = list(executor.map(lambda i: classifier.forward(CITATION.format(i), "Giriş"), range(8)))
+
+    assert classifier.forwarded == 1
+    assert classifier.reused["llm"] == 7
+    assert classifier.waited == 7
+    assert len({p.intent for p in predictions}) == 1
+
+
+def test_near_duplicates_in_the_same_pack_are_sent_once():
+    lm = FakeLM()
+    dspy.configure(lm=lm)
+    classifier = DedupClassifier(NearDuplicateIndex(threshold=0.85), PackedClassifyCitation(pack_size=8))
+
+    predictions = classifier.forward_many([(CITATION.format(i), "Giriş") for i in range(4)]
+                                          + [("Bu çalışmada önerilen yöntem kullanılmıştır [9] .", "Yöntem")])
+
+    assert classifier.forwarded == 2
+    assert classifier.reused["llm"] == 3
+    assert all(p.intent is not None for p in predictions)
+    assert lm.calls == 1
+
+
+def test_failed_owner_releases_waiters():
+    dspy.configure(lm=FakeLM(error_rate=1.0))
+    index = NearDuplicateIndex(threshold=0.85)
+    classifier = DedupClassifier(index, ClassifyCitation())
+
+    with suppress(Exception):
+        classifier.forward(CITATION.format(1), "Giriş")
+    assert index._pending == {}
+    assert index.claim(index.signature(CITATION.format(2)), "Giriş")[0] == "owner"
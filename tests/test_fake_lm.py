@@ -0,0 +1,22 @@
+import dspy
+
+from citation_classifier.fake_lm import FakeLM
+from citation_classifier.program import ClassifyCitation
+
+
+def test_copy_has_its_own_kwargs_and_history_but_shares_counters():
+    lm = FakeLM()
+    dspy.configure(lm=lm)
+    ClassifyCitation()(citation="Bu yöntem daha önce önerilmiştir [1] .", section="Giriş")
+    history = len(lm.history)
+
+    copy = lm.copy(temperature=1.0)
+    assert copy is not lm
+    assert lm.kwargs["temperature"] == 0.0
+    assert copy.kwargs["temperature"] == 1.0
+    assert len(lm.history) == history
+    assert copy.history == []
+
+    with dspy.context(lm=copy):
+        ClassifyCitation()(citation="Bu yöntem daha önce önerilmiştir [2] .", section="Giriş")
+    assert lm.calls == copy.calls == 2
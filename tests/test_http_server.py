@@ -0,0 +1,111 @@
+import http.client
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import pytest
+
+from citation_classifier.config import CITATION_CLASSES
+from citation_classifier.fake_lm import FakeLM
+from citation_classifier.http_server import ClassificationService, create_server, scheduled_call
+from citation_classifier.program import ClassifyCitation, PackedClassifyCitation
+from citation_classifier.scheduler import RateLimitedScheduler
+
+
+@pytest.fixture
+def server():
+    dspy.configure(lm=FakeLM(latency_s=0.05))
+    service = ClassificationService(ClassifyCitation(), window_s=0.05, max_batch=16, request_timeout=30)
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def post(server, path, payload):
+    host, port = server.server_address[:2]
+    request = urllib.request.Request(f"http://{host}:{port}{path}", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, json.loads(response.read())
+
+
+def post_raw(server, content_length):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    try:
+        connection.putrequest("POST", "/classify")
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", content_length)
+        connection.endheaders()
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_concurrent_requests_are_micro_batched(server):
+    items = [{"id": str(i), "citation": f"Bu yöntem daha önce önerilmiştir [{i}] .", "section": "Giriş"}
+             for i in range(24)]
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        responses = list(executor.map(lambda item: post(server, "/classify", item), items))
+
+    assert [status for status, _ in responses] == [200] * len(items)
+    assert [body["id"] for _, body in responses] == [item["id"] for item in items]
+    assert all(body["status"] == "ok" and body["intent"] in CITATION_CLASSES for _, body in responses)
+
+    metrics = server.service.snapshot()
+    assert metrics["requests"] == len(items)
+    assert metrics["batches"]["count"] < len(items)
+    assert metrics["batches"]["max_size"] > 1
+
+
+def test_bulk_request_returns_one_result_per_item(server):
+    items = [{"id": str(i), "citation": f"Sonuçlarımız önceki çalışmayla uyumludur [{i}] .", "section": "Tartışma"}
+             for i in range(5)]
+    status, body = post(server, "/classify/bulk", {"items": items})
+
+    assert status == 200
+    assert [result["id"] for result in body["results"]] == [item["id"] for item in items]
+    assert all(result["status"] == "ok" for result in body["results"])
+
+
+@pytest.mark.parametrize("content_length", ["-1", "abc", "1e3"])
+def test_invalid_content_length_is_rejected(server, content_length):
+    status, body = post_raw(server, content_length)
+
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_oversized_body_is_rejected_without_reading_it(server):
+    status, _ = post_raw(server, str(64 * 1024 * 1024))
+
+    assert status == 413
+
+
+def test_packed_batches_are_retried_through_the_scheduler():
+    lm = FakeLM(error_rate=0.5, seed=4)  # ilk çağrılar 503 ile başarısız olur
+    dspy.configure(lm=lm)
+    program = PackedClassifyCitation(pack_size=4)
+    scheduler = RateLimitedScheduler(scheduled_call(program), requests_per_minute=6000, max_retries=20,
+                                     base_delay=0.001, max_delay=0.01)
+    service = ClassificationService(program, window_s=0.05, max_batch=8, request_timeout=30, scheduler=scheduler)
+    try:
+        items = [{"id": str(i), "citation": f"Önerilen yöntem uygulanmıştır [{i}] .", "section": "Yöntem"}
+                 for i in range(8)]
+        results = service.classify(items)
+    finally:
+        service.close()
+
+    assert [result["status"] for result in results] == ["ok"] * len(items)
+    summary = service.snapshot()["scheduler"]
+    assert summary["retries"] > 0
+    # Her paket tek LM isteğidir; başarılı çağrı sayısı paket sayısına eşittir
+    assert summary["succeeded"] == 2
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import pytest
+
+from citation_classifier.config import CITATION_CLASSES
+from citation_classifier.fake_lm import FakeLM, FakeLMError
+from citation_classifier.program import PackedClassifyCitation
+
+CITATIONS = [(f"Bu yöntem daha önce önerilmiştir [{i}] .", "Giriş") for i in range(16)]
+
+
+def test_transient_lm_errors_are_raised_instead_of_splitting_the_pack():
+    dspy.configure(lm=FakeLM(error_rate=1.0))
+    module = PackedClassifyCitation(pack_size=16)
+
+    with pytest.raises(FakeLMError):
+        module.forward_many(CITATIONS)
+    assert module.requests == 1
+    assert module.splits == 0
+
+
+def test_pack_is_classified_in_a_single_request():
+    dspy.configure(lm=FakeLM())
+    module = PackedClassifyCitation(pack_size=16)
+
+    predictions = module.forward_many(CITATIONS)
+    assert module.requests == 1
+    assert all(p.intent in CITATION_CLASSES for p in predictions)
+
+
+def test_request_counter_is_exact_under_concurrency():
+    dspy.configure(lm=FakeLM())
+    module = PackedClassifyCitation(pack_size=2)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda _: module.forward_many(CITATIONS), range(16)))
+    assert module.requests == 16 * len(CITATIONS) // 2
+
+
+def test_copies_get_their_own_counter_lock():
+    module = PackedClassifyCitation(pack_size=4)
+    copy = module.deepcopy()
+    assert copy._stats_lock is not module._stats_lock
+    assert copy.pack_size == 4
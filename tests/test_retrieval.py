@@ -0,0 +1,29 @@
+import csv
+import json
+
+from citation_classifier.retrieval import load_or_build_demo_index
+
+CITATION = "Bu yöntem daha önce önerilmiştir [1] ."
+
+
+def write_program(path, reasoning):
+    demos = [{"citation": CITATION, "section": "Giriş", "intent": "background", "reasoning": reasoning}]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"classifier.predict": {"demos": demos}}, f, ensure_ascii=False)
+
+
+def test_index_is_rebuilt_when_program_demo_reasoning_changes(tmp_path):
+    train_csv = tmp_path / "train.csv"
+    with open(train_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["citation_intent", "citation_context", "section"])
+        writer.writerow(["background", CITATION, "Giriş"])
+        writer.writerow(["basis", "Önerilen algoritma uygulanmıştır [2] .", "Yöntem"])
+    program_path = str(tmp_path / "program.json")
+
+    write_program(program_path, "eski gerekçe")
+    assert load_or_build_demo_index(program_path, str(train_csv)).rows[0]["reasoning"] == "eski gerekçe"
+    assert load_or_build_demo_index(program_path, str(train_csv)).rows[0]["reasoning"] == "eski gerekçe"
+
+    write_program(program_path, "yeni gerekçe")
+    assert load_or_build_demo_index(program_path, str(train_csv)).rows[0]["reasoning"] == "yeni gerekçe"
@@ -0,0 +1,49 @@
+import asyncio
+
+import dspy
+
+from citation_classifier.config import CITATION_CLASSES
+from citation_classifier.fake_lm import FakeLM, FakeLMError, FakeRateLimitError
+from citation_classifier.program import ClassifyCitation
+from citation_classifier.scheduler import RateLimitedScheduler, is_rate_limit_error, is_retryable_error
+
+
+def test_rate_limit_detection_uses_status_code_not_message():
+    assert is_rate_limit_error(FakeRateLimitError("limit"))
+    assert not is_rate_limit_error(ValueError("citation [429] could not be parsed"))
+    assert is_retryable_error(FakeLMError("server error", status_code=503))
+    assert not is_retryable_error(FakeLMError("bad request", status_code=400))
+
+    try:
+        try:
+            raise FakeRateLimitError("limit")
+        except FakeRateLimitError as e:
+            raise RuntimeError("adapter failed") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limit_error(wrapped)
+
+
+def test_scheduler_retries_rate_limited_calls_until_all_succeed():
+    # 0.5 sn'lik pencerede en fazla 3 istek: planlayıcının yerel bütçesi yüksek tutulduğu için sağlayıcı 429 döndürür
+    lm = FakeLM(requests_per_minute=3, rate_window_s=0.5)
+    dspy.configure(lm=lm)
+    scheduler = RateLimitedScheduler(ClassifyCitation().forward, requests_per_minute=6000, initial_concurrency=4,
+                                     max_retries=20, base_delay=0.01, max_delay=0.5)
+    citations = [f"Bu yöntem daha önce önerilmiştir [{i}] ." for i in range(12)]
+
+    async def classify_all():
+        return await asyncio.gather(*(scheduler.submit(citation=c, section="Giriş") for c in citations))
+
+    try:
+        results = asyncio.run(classify_all())
+    finally:
+        scheduler.close()
+
+    assert len(results) == len(citations)
+    assert all(result.intent in CITATION_CLASSES for result in results)
+    summary = scheduler.summary()
+    assert summary["succeeded"] == len(citations)
+    assert summary["failed"] == 0
+    assert summary["rate_limited"] > 0
+    assert summary["retries"] == summary["rate_limited"]
+    assert summary["calls"] == summary["succeeded"] + summary["retries"]